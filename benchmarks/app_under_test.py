@@ -0,0 +1,19 @@
+"""
+app_under_test
+==============
+⚙ This module runs `english_app.main()` with the deck given by `TRANSLATE_THAT_BENCH_DECK` as the uploaded file (used with Streamlit's `AppTest`)
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import english_app
+from benchmarks.generate_decks import UploadedBytes
+
+_path = Path(os.environ["TRANSLATE_THAT_BENCH_DECK"])
+_content = _path.read_bytes()
+english_app.upload_file = lambda selected_language: UploadedBytes(_content, _path.name)
+english_app.main()
@@ -0,0 +1,235 @@
+"""
+bench_components
+================
+⚙ This module benchmarks the `app_components` hot paths and full `english_app.py` reruns on synthetic decks
+
+Usage : `python -m benchmarks.bench_components --rows 1000 10000 --formats csv xlsx --output bench.json`
+
+Each result reports the p50/p99 latency, the throughput and the peak memory (`tracemalloc`) as JSON.
+Grading one answer against 40 close accepted answers must stay under `GRADE_TARGET_MS` (p99) : the
+command exits with an error otherwise.
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable
+
+# les decks compilés, la progression et le journal des réponses vont dans un dossier temporaire, pas dans le dépôt
+BENCH_DIR = Path(tempfile.mkdtemp(prefix="translate-that-bench-"))
+os.environ.setdefault("TRANSLATE_THAT_DECK_DIR", str(BENCH_DIR / "decks"))
+os.environ.setdefault("TRANSLATE_THAT_PROGRESS_DB", str(BENCH_DIR / "progress.sqlite3"))
+os.environ.setdefault("TRANSLATE_THAT_EVENT_LOG", str(BENCH_DIR / "answers.jsonl"))
+
+import numpy as np
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.generate_decks import DECK_DIR, UploadedBytes, ensure_deck
+from components.app_components import (
+    check_columns,
+    display_data,
+    get_choices,
+    get_deck,
+    get_next_word,
+    get_random_word,
+    load_data,
+    post_submit,
+)
+from components.deck_cache import deck_cache
+from components.deck_format import DECK_DIR as COMPILED_DIR
+from components.grading import grade
+from components.precompute import precomputer
+
+# coupe les avertissements du mode "bare" de Streamlit (appels hors `streamlit run`)
+logging.disable(logging.WARNING)
+
+APP_UNDER_TEST = Path(__file__).with_name("app_under_test.py")
+# notation d'une réponse contre de nombreuses traductions acceptées proches
+GRADE_CANDIDATES = 40
+GRADE_TARGET_MS = 1.0
+
+
+def summarize(samples: list[float], peak_bytes: int) -> dict:
+    """Résume des durées (en secondes) en latences, débit et mémoire."""
+    values = np.array(samples)
+    return {
+        "runs": len(values),
+        "p50_ms": round(float(np.percentile(values, 50)) * 1e3, 4),
+        "p99_ms": round(float(np.percentile(values, 99)) * 1e3, 4),
+        "mean_ms": round(float(values.mean()) * 1e3, 4),
+        "throughput_per_s": round(len(values) / float(values.sum()), 2),
+        "peak_bytes": peak_bytes,
+    }
+
+
+def measure(
+    fn: Callable[[], object], repeat: int, setup: Callable[[], None] | None = None
+) -> dict:
+    """Chronomètre `fn` (sans traçage), puis mesure son pic mémoire sur un appel tracé."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return summarize(samples, peak)
+
+
+def bench_components(path: Path, repeat: int) -> dict[str, dict]:
+    """Chronomètre chaque fonction du chemin critique sur un deck."""
+    content = path.read_bytes()
+    upload = lambda: UploadedBytes(content, path.name)
+    results = {}
+
+    def cold() -> None:
+        deck_cache.clear()
+        shutil.rmtree(COMPILED_DIR, ignore_errors=True)
+
+    results["load_data_parse"] = measure(
+        lambda: load_data(upload()), max(1, repeat // 10), cold
+    )
+    results["load_data_compiled"] = measure(
+        lambda: load_data(upload()), max(1, repeat // 10), deck_cache.clear
+    )
+    results["load_data_cached"] = measure(lambda: load_data(upload()), repeat)
+    data = load_data(upload())
+    results["check_columns"] = measure(lambda: check_columns(data), repeat)
+
+    st.session_state.clear()
+    deck = get_deck(data)
+    results["get_random_word"] = measure(lambda: get_random_word(deck, "FR"), repeat)
+
+    def next_word() -> None:
+        st.session_state.index = (st.session_state.get("index", -1) + 1) % len(deck)
+        get_next_word(deck, "FR")
+
+    results["get_next_word"] = measure(next_word, repeat)
+
+    def submit() -> None:
+        _, st.session_state.correct_translation = get_random_word(deck, "FR")
+        post_submit("FR", st.session_state.correct_translation[:-1] + "x", deck)
+
+    results["post_submit"] = measure(submit, repeat)
+    results["display_data"] = measure(lambda: display_data(data, "FR", deck), repeat)
+
+    # les index sont construits en arrière-plan par `get_deck` : on attend qu'ils soient prêts
+    precomputer.wait(deck.digest)
+
+    def search() -> None:
+        st.session_state.learning_search = deck.french[len(deck) // 2][:4]
+        display_data(data, "FR", deck)
+
+    results["display_data_search"] = measure(search, repeat)
+    results["deck_subset"] = measure(lambda: deck.subset(deck.english[0][:6]), repeat)
+
+    deck.neighbour_index("FR")
+    results["get_choices"] = measure(
+        lambda: get_choices(deck, int(np.random.randint(len(deck))), "FR"), repeat
+    )
+    return results
+
+
+def bench_grading(path: Path, repeat: int) -> dict:
+    """Chronomètre `grade` contre `GRADE_CANDIDATES` traductions acceptées proches.
+
+    Les candidats sont les réponses les plus proches d'une carte (`NeighbourIndex`), et la
+    réponse notée est une autre réponse proche : elle est fausse, donc tous les candidats sont
+    examinés (pire cas). Le p99 est comparé à `GRADE_TARGET_MS`.
+    """
+    deck = get_deck(load_data(UploadedBytes(path.read_bytes(), path.name)))
+    answers = deck.normalized[1]
+    index = deck.neighbour_index("FR")
+    rng = np.random.default_rng(0)
+    cases = []
+    for row in rng.integers(len(deck), size=repeat).tolist():
+        rows = index.nearest(row, GRADE_CANDIDATES).tolist()
+        if len(rows) == GRADE_CANDIDATES:
+            accepted = tuple(answers[other] for other in rows[:-1]) + (answers[row],)
+            cases.append((answers[rows[-1]], accepted))
+    queue = itertools.cycle(cases)
+    result = measure(lambda: grade(*next(queue)), len(cases))
+    result["candidates"] = GRADE_CANDIDATES
+    result["target_ms"] = GRADE_TARGET_MS
+    result["within_target"] = result["p99_ms"] <= GRADE_TARGET_MS
+    return result
+
+
+def bench_reruns(path: Path, reruns: int) -> dict:
+    """Mesure des reruns complets de `english_app.py` en session d'entraînement (AppTest)."""
+    os.environ["TRANSLATE_THAT_BENCH_DECK"] = str(path)
+    samples = []
+    at = AppTest.from_file(str(APP_UNDER_TEST), default_timeout=600)
+    start = time.perf_counter()
+    at.run()
+    first_run = time.perf_counter() - start
+    at.sidebar.selectbox[0].select(at.sidebar.selectbox[0].options[2]).run()
+    for i in range(reruns):
+        start = time.perf_counter()
+        if i % 2 == 0:
+            at.text_input[0].input(at.session_state.correct_translation_train)
+            at.button[0].click().run()
+        else:
+            at.button[1].click().run()
+        samples.append(time.perf_counter() - start)
+        if at.exception:
+            raise RuntimeError(at.exception)
+    result = summarize(samples, peak_bytes=0)
+    result.pop("peak_bytes")
+    result["first_run_ms"] = round(first_run * 1e3, 4)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--formats", nargs="+", default=["csv", "xlsx"])
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--reruns", type=int, default=20)
+    parser.add_argument("--decks", type=Path, default=DECK_DIR)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+    for rows in args.rows:
+        for fmt in args.formats:
+            path = ensure_deck(rows, fmt, args.decks)
+            entry = {"rows": rows, "format": fmt, "file_bytes": path.stat().st_size}
+            entry["components"] = bench_components(path, args.repeat)
+            entry["components"]["grade"] = bench_grading(path, args.repeat)
+            if args.reruns:
+                entry["apptest_rerun"] = bench_reruns(path, args.reruns)
+            report["results"].append(entry)
+    output = json.dumps(report, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output)
+    shutil.rmtree(BENCH_DIR, ignore_errors=True)
+    if not all(
+        entry["components"]["grade"]["within_target"] for entry in report["results"]
+    ):
+        raise SystemExit(f"grade : p99 au-dessus de {GRADE_TARGET_MS} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+generate_decks
+==============
+⚙ This module generates synthetic French/English decks (words, expressions and sentences) for the benchmarks
+
+Usage : `python -m benchmarks.generate_decks --rows 1000 100000 --formats csv xlsx`
+"""
+
+import argparse
+import io
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# proportions de mots, d'expressions (2 à 4 mots) et de phrases (5 à 15 mots)
+KIND_WEIGHTS = (0.4, 0.35, 0.25)
+FR_SYLLABLES = "la mai son é té ri vè re chou an ç on pre nd eu".split()
+EN_SYLLABLES = "the ho use sum mer ri ver cab ba ge ta ke lo ng it".split()
+DECK_DIR = Path(__file__).parent / "decks"
+
+
+class UploadedBytes(io.BytesIO):
+    """Imite le fichier renvoyé par `st.file_uploader`."""
+
+    def __init__(self, content: bytes, name: str):
+        super().__init__(content)
+        self.name = name
+
+
+def _vocabulary(
+    syllables: list[str], size: int, rng: np.random.Generator
+) -> np.ndarray:
+    """Crée un vocabulaire de pseudo-mots de 1 à 4 syllabes."""
+    lengths = rng.integers(1, 5, size)
+    picks = rng.integers(0, len(syllables), (size, 4))
+    return np.array(
+        ["".join(syllables[p] for p in row[:n]) for row, n in zip(picks, lengths)],
+        dtype=object,
+    )
+
+
+def generate_deck(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Génère un deck French/English avec un mélange réaliste de longueurs."""
+    rng = np.random.default_rng(seed)
+    vocab_size = max(50, min(rows, 20_000))
+    french_vocab = _vocabulary(FR_SYLLABLES, vocab_size, rng)
+    english_vocab = _vocabulary(EN_SYLLABLES, vocab_size, rng)
+    kinds = rng.choice(3, size=rows, p=KIND_WEIGHTS)
+    word_counts = np.where(
+        kinds == 0,
+        1,
+        np.where(kinds == 1, rng.integers(2, 5, rows), rng.integers(5, 16, rows)),
+    )
+    french, english = [], []
+    for count, kind in zip(word_counts, kinds):
+        ids = rng.integers(0, vocab_size, count)
+        fr, en = " ".join(french_vocab[ids]), " ".join(english_vocab[ids])
+        if kind == 2:
+            fr, en = fr.capitalize() + ".", en.capitalize() + "."
+        french.append(fr)
+        english.append(en)
+    return pd.DataFrame({"French": french, "English": english})
+
+
+def write_deck(data: pd.DataFrame, path: Path) -> Path:
+    """Écrit un deck au format CSV ou Excel selon l'extension."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix == ".csv":
+        data.to_csv(path, index=False)
+    else:
+        data.to_excel(path, index=False)
+    return path
+
+
+def deck_path(rows: int, fmt: str, directory: Path = DECK_DIR) -> Path:
+    return directory / f"deck_{rows}.{fmt}"
+
+
+def ensure_deck(rows: int, fmt: str, directory: Path = DECK_DIR) -> Path:
+    """Renvoie le chemin d'un deck synthétique, en le générant s'il n'existe pas encore."""
+    path = deck_path(rows, fmt, directory)
+    if not path.exists():
+        write_deck(generate_deck(rows), path)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--formats", nargs="+", default=["csv", "xlsx"])
+    parser.add_argument("--out", type=Path, default=DECK_DIR)
+    args = parser.parse_args()
+    for rows in args.rows:
+        for fmt in args.formats:
+            print(ensure_deck(rows, fmt, args.out))
@@ -0,0 +1,353 @@
+"""
+load_test
+=========
+⚙ This module simulates many concurrent learners driving `english_app.py` (Streamlit's `AppTest`) to find how many sessions one instance can serve
+
+Usage : `python -m benchmarks.load_test --rows 10000 --concurrency 1 2 4 8 --steps 10 --output load.json`
+
+Each learner uploads the deck, sets a username, then goes through the learning, random text,
+training and multiple choice modes, submitting answers and moving to the next card.
+
+- `--mode instance` (default) => all learners are sessions of one process, like the sessions of
+  one app instance : they share the deck registry and caches. `AppTest` is not thread-safe, so the
+  sessions take turns : in each round, every learner runs its next rerun. The reruns of an
+  instance share the GIL anyway, so `queued` gives the latency a learner sees when everyone acts
+  in the same round (the reruns of the round that run before its own, plus its own).
+- `--mode processes` => each learner runs in its own worker process, all starting together. This
+  measures CPU contention between N single-user instances : nothing is shared between learners.
+
+For each level, the report gives the rerun latency percentiles (overall and per action), the
+throughput of the whole level and the RSS added by each session. `capacity` is the highest level
+whose p99 latency (`queued` in instance mode) stays within `--budget-ms`.
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# les decks compilés, la progression et le journal des réponses vont dans un dossier temporaire,
+# partagé par tous les learners (comme par les sessions d'une même instance)
+LOAD_DIR = Path(
+    os.environ.get("TRANSLATE_THAT_LOAD_DIR")
+    or tempfile.mkdtemp(prefix="translate-that-load-")
+)
+os.environ["TRANSLATE_THAT_LOAD_DIR"] = str(LOAD_DIR)
+os.environ.setdefault("TRANSLATE_THAT_DECK_DIR", str(LOAD_DIR / "decks"))
+os.environ.setdefault("TRANSLATE_THAT_PROGRESS_DB", str(LOAD_DIR / "progress.sqlite3"))
+os.environ.setdefault("TRANSLATE_THAT_EVENT_LOG", str(LOAD_DIR / "answers.jsonl"))
+
+import numpy as np
+
+from benchmarks.generate_decks import DECK_DIR, ensure_deck
+
+APP_UNDER_TEST = Path(__file__).with_name("app_under_test.py")
+# part des réponses justes d'un learner simulé
+CORRECT_RATE = 0.7
+# attente maximale (en secondes) des index construits en arrière-plan
+INDEX_WAIT = 120
+
+
+def rss_bytes() -> int:
+    """Mémoire résidente actuelle du processus (à défaut, son pic)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def learner_session(learner: int, steps: int):
+    """Joue une session complète, un rerun à la fois.
+
+    Générateur : renvoie (action, secondes) après chaque rerun, et None tant que les index ne sont
+    pas prêts (la session attend, puis rafraîchit la page au tour suivant).
+    """
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(learner)
+    at = AppTest.from_file(str(APP_UNDER_TEST), default_timeout=600)
+
+    def timed(action: str, run) -> tuple[str, float]:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if at.exception:
+            raise RuntimeError(at.exception[0].message)
+        return action, elapsed
+
+    def select_mode(position: int) -> tuple[str, float]:
+        selectbox = at.sidebar.selectbox[0]
+        return timed(
+            "mode", lambda: selectbox.select(selectbox.options[position]).run()
+        )
+
+    def answer(expected: str) -> str:
+        return expected if rng.random() < CORRECT_RATE else "je ne sais pas"
+
+    yield timed("upload", at.run)
+    yield timed(
+        "username",
+        lambda: at.text_input(key="username").input(f"learner-{learner}").run(),
+    )
+
+    yield select_mode(0)
+    # la recherche n'est active qu'une fois l'index construit : rafraîchi chaque seconde, comme dans le navigateur
+    for _ in range(INDEX_WAIT):
+        if not at.text_input(key="learning_search").disabled:
+            break
+        yield None
+        yield timed("refresh", at.run)
+    yield timed(
+        "search", lambda: at.text_input(key="learning_search").input("the").run()
+    )
+
+    yield select_mode(1)
+    for _ in range(steps):
+        at.text_input(key="trad").input(answer(at.session_state.correct_translation))
+        yield timed("submit", at.button[0].click().run)
+        yield timed("next", at.button[1].click().run)
+
+    yield select_mode(2)
+    for _ in range(steps):
+        at.text_input(key="trad").input(
+            answer(at.session_state.correct_translation_train)
+        )
+        yield timed("submit", at.button[0].click().run)
+        yield timed("next", at.button[1].click().run)
+
+    yield select_mode(4)
+    for _ in range(steps):
+        at.radio(key="choice").set_value(rng.choice(at.session_state.choice_options))
+        yield timed("submit", at.button[0].click().run)
+        yield timed("next", at.button[1].click().run)
+
+
+def simulate_learner(learner: int, steps: int) -> tuple[list[tuple[str, float]], float]:
+    """Joue une session seule, d'une traite.
+
+    Renvoie la durée de chaque rerun ([(action, secondes)]) et le temps passé à attendre les index.
+    """
+    samples, idle = [], 0.0
+    for sample in learner_session(learner, steps):
+        if sample is None:
+            time.sleep(1.0)
+            idle += 1.0
+        else:
+            samples.append(sample)
+    return samples, idle
+
+
+def simulate_instance(
+    learners: int, steps: int
+) -> tuple[list[tuple[str, float]], list[float], float]:
+    """Joue `learners` sessions dans ce processus, à tour de rôle.
+
+    Renvoie la durée de chaque rerun, l'attente de chaque rerun dans son tour (les reruns
+    précédents du tour, plus le sien) et le temps passé à attendre les index.
+    """
+    sessions = [learner_session(learner, steps) for learner in range(learners)]
+    samples, queued, idle = [], [], 0.0
+    while sessions:
+        elapsed, waiting = 0.0, True
+        for session in list(sessions):
+            try:
+                sample = next(session)
+            except StopIteration:
+                sessions.remove(session)
+                continue
+            if sample is None:
+                continue
+            waiting = False
+            samples.append(sample)
+            elapsed += sample[1]
+            # comme pour les reruns, l'upload n'est pas compté (mais retarde la suite du tour)
+            if sample[0] != "upload":
+                queued.append(elapsed)
+        if waiting and sessions:
+            time.sleep(1.0)
+            idle += 1.0
+    return samples, queued, idle
+
+
+def _learner_process(learner: int, steps: int, barrier, results) -> None:
+    """Point d'entrée d'un worker (mode processes) : attend les autres learners, puis joue la session."""
+    # coupe les avertissements du mode "bare" de Streamlit (appels hors `streamlit run`)
+    logging.disable(logging.WARNING)
+    import english_app  # noqa: F401 (imports chargés avant la mesure de la mémoire de base)
+
+    baseline = rss_bytes()
+    start, idle = time.perf_counter(), 0.0
+    try:
+        barrier.wait()
+        start = time.perf_counter()
+        samples, idle = simulate_learner(learner, steps)
+        error = None
+    except Exception as exc:
+        samples, error = [], repr(exc)
+    results.put(
+        {
+            "sessions": 1,
+            "samples": samples,
+            "queued": [],
+            # le débit ne compte pas l'attente des index
+            "elapsed": time.perf_counter() - start - idle,
+            "baseline_rss": baseline,
+            "rss": rss_bytes(),
+            "error": error,
+        }
+    )
+
+
+def _instance_process(learners: int, steps: int, results) -> None:
+    """Point d'entrée du worker (mode instance) : toutes les sessions dans un seul processus."""
+    logging.disable(logging.WARNING)
+    import english_app  # noqa: F401
+
+    baseline = rss_bytes()
+    start, idle = time.perf_counter(), 0.0
+    try:
+        samples, queued, idle = simulate_instance(learners, steps)
+        error = None
+    except Exception as exc:
+        samples, queued, error = [], [], repr(exc)
+    results.put(
+        {
+            "sessions": learners,
+            "samples": samples,
+            "queued": queued,
+            "elapsed": time.perf_counter() - start - idle,
+            "baseline_rss": baseline,
+            "rss": rss_bytes(),
+            "error": error,
+        }
+    )
+
+
+def percentiles(values: list[float]) -> dict:
+    """Résume des durées (en secondes) en percentiles (en millisecondes)."""
+    array = np.array(values) * 1e3
+    return {
+        "runs": len(array),
+        "p50_ms": round(float(np.percentile(array, 50)), 2),
+        "p90_ms": round(float(np.percentile(array, 90)), 2),
+        "p99_ms": round(float(np.percentile(array, 99)), 2),
+        "max_ms": round(float(array.max()), 2),
+    }
+
+
+def run_level(concurrency: int, steps: int, mode: str) -> dict:
+    """Lance `concurrency` learners en même temps : sessions d'un processus, ou un processus chacun."""
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    if mode == "instance":
+        processes = [
+            context.Process(
+                target=_instance_process, args=(concurrency, steps, results)
+            )
+        ]
+    else:
+        barrier = context.Barrier(concurrency)
+        processes = [
+            context.Process(
+                target=_learner_process, args=(learner, steps, barrier, results)
+            )
+            for learner in range(concurrency)
+        ]
+    for process in processes:
+        process.start()
+    # les résultats sont lus avant `join` : un processus ne se termine pas tant que sa file est pleine
+    reports = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    errors = [report["error"] for report in reports if report["error"]]
+    samples = [sample for report in reports for sample in report["samples"]]
+    reruns = [seconds for action, seconds in samples if action != "upload"]
+    entry = {"concurrency": concurrency, "errors": errors}
+    if not reruns:
+        return entry
+    wall = max(report["elapsed"] for report in reports)
+    entry["rerun"] = percentiles(reruns)
+    if mode == "instance":
+        entry["queued"] = percentiles(reports[0]["queued"])
+    entry["actions"] = {
+        action: percentiles([seconds for name, seconds in samples if name == action])
+        for action in sorted({name for name, _ in samples})
+    }
+    entry["throughput_reruns_per_s"] = round(len(reruns) / wall, 2)
+    # mémoire ajoutée par chaque session : en mode instance, le deck partagé n'est compté qu'une fois
+    session_rss = [
+        (report["rss"] - report["baseline_rss"]) / report["sessions"]
+        for report in reports
+    ]
+    entry["rss_per_session_bytes"] = {
+        "mean": int(np.mean(session_rss)),
+        "max": int(np.max(session_rss)),
+    }
+    entry["rss_per_process_bytes"] = int(np.mean([r["rss"] for r in reports]))
+    return entry
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--format", default="csv")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--mode", choices=["instance", "processes"], default="instance")
+    parser.add_argument("--budget-ms", type=float, default=500.0)
+    parser.add_argument("--decks", type=Path, default=DECK_DIR)
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    path = ensure_deck(args.rows, args.format, args.decks)
+    os.environ["TRANSLATE_THAT_BENCH_DECK"] = str(path)
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "rows": args.rows,
+        "format": args.format,
+        "steps": args.steps,
+        "mode": args.mode,
+        # en mode processes, chaque learner a son propre registre de decks
+        "shared_decks": args.mode == "instance",
+        "budget_ms": args.budget_ms,
+        "levels": [],
+        "capacity": 0,
+    }
+    degraded = False
+    for concurrency in args.concurrency:
+        entry = run_level(concurrency, args.steps, args.mode)
+        report["levels"].append(entry)
+        latency = entry.get("queued", entry.get("rerun"))
+        degraded = (
+            degraded
+            or bool(entry["errors"])
+            or latency is None
+            or latency["p99_ms"] > args.budget_ms
+        )
+        if not degraded:
+            report["capacity"] = concurrency
+    output = json.dumps(report, indent=2)
+    if args.output is None:
+        print(output)
+    else:
+        args.output.write_text(output)
+    shutil.rmtree(LOAD_DIR, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
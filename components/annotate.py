@@ -0,0 +1,174 @@
+"""
+annotate
+========
+⚙ This module holds the batched spaCy part-of-speech / lemma annotation of deck entries, cached on disk by phrase hash
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Iterable
+
+MODELS = {
+    "French": os.environ.get("TRANSLATE_THAT_SPACY_FR", "fr_core_news_sm"),
+    "English": os.environ.get("TRANSLATE_THAT_SPACY_EN", "en_core_web_sm"),
+}
+# seuls le tagging et la lemmatisation servent : le reste du pipeline n'est pas chargé
+UNUSED_PIPES = ("parser", "ner", "senter")
+ANNOTATION_DB = os.environ.get("TRANSLATE_THAT_ANNOTATION_DB", ".annotations.sqlite3")
+BATCH_SIZE = int(os.environ.get("TRANSLATE_THAT_SPACY_BATCH", 256))
+N_PROCESS = int(os.environ.get("TRANSLATE_THAT_SPACY_PROCESSES", 1))
+MEMORY_DECKS = 4
+
+# (texte, étiquette POS, lemme, espace qui suit)
+Token = tuple[str, str, str, str]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS annotations (
+    model TEXT NOT NULL,
+    phrase TEXT NOT NULL,
+    tokens TEXT NOT NULL,
+    PRIMARY KEY (model, phrase)
+) WITHOUT ROWID;
+"""
+
+
+def phrase_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def load_model(name: str):
+    """Charge un modèle spaCy au premier usage, sans les composants inutiles.
+
+    Renvoie `None` si spaCy ou le modèle n'est pas installé (`python -m spacy download <name>`).
+    """
+    try:
+        import spacy
+
+        return spacy.load(name, exclude=list(UNUSED_PIPES))
+    except (ImportError, OSError):
+        return None
+
+
+class AnnotationStore:
+    """Cache disque des annotations (SQLite), indexé par (modèle, empreinte de la phrase)."""
+
+    def __init__(self, path: str = ANNOTATION_DB):
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get_many(self, model: str, hashes: list[str]) -> dict[str, list[Token]]:
+        found = {}
+        with self._lock:
+            # par paquets : SQLite limite le nombre de paramètres d'une requête
+            for start in range(0, len(hashes), 900):
+                chunk = hashes[start : start + 900]
+                rows = self._connection.execute(
+                    "SELECT phrase, tokens FROM annotations WHERE model = ? AND phrase IN "
+                    f"({','.join('?' * len(chunk))})",
+                    (model, *chunk),
+                )
+                found.update((phrase, json.loads(tokens)) for phrase, tokens in rows)
+        return found
+
+    def put_many(self, model: str, items: Iterable[tuple[str, list[Token]]]) -> None:
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO annotations VALUES (?, ?, ?)",
+                ((model, phrase, json.dumps(tokens)) for phrase, tokens in items),
+            )
+
+
+class Annotator:
+    """Annote toutes les phrases d'une colonne en une fois, par lots `nlp.pipe`.
+
+    Les phrases déjà vues (même dans un autre deck) sont relues depuis le cache disque ; les
+    annotations des derniers decks restent en mémoire, pour un accès en O(1) à chaque rerun.
+    """
+
+    def __init__(self, store: AnnotationStore | None = None):
+        self._store = store
+        self._decks: OrderedDict[tuple[str, str], dict[str, list[Token]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        # modèles introuvables (spaCy ou modèle non installé)
+        self.missing: set[str] = set()
+
+    @property
+    def store(self) -> AnnotationStore:
+        if self._store is None:
+            self._store = AnnotationStore()
+        return self._store
+
+    def cached(self, digest: str, column: str) -> dict[str, list[Token]] | None:
+        """Annotations déjà en mémoire pour ce deck, sans rien calculer (None sinon)."""
+        with self._lock:
+            return self._decks.get((digest, MODELS[column]))
+
+    def annotate(
+        self,
+        digest: str,
+        column: str,
+        texts: Iterable[str],
+        progress: Callable[[float], object] | None = None,
+    ) -> dict[str, list[Token]] | None:
+        """Renvoie {phrase: tokens} pour toutes les phrases de la colonne (None sans modèle)."""
+        model = MODELS[column]
+        with self._lock:
+            if (digest, model) in self._decks:
+                self._decks.move_to_end((digest, model))
+                return self._decks[(digest, model)]
+        nlp = load_model(model)
+        if nlp is None:
+            self.missing.add(model)
+            return None
+        phrases = sorted({text for text in texts if text})
+        hashes = {text: phrase_hash(text) for text in phrases}
+        # une nouvelle version d'un deck reprend d'abord les annotations déjà en mémoire
+        with self._lock:
+            others = [
+                known for (_, name), known in self._decks.items() if name == model
+            ]
+        cached = {}
+        for text in phrases:
+            for known in others:
+                if text in known:
+                    cached[hashes[text]] = known[text]
+                    break
+        cached.update(
+            self.store.get_many(
+                model, [hashes[text] for text in phrases if hashes[text] not in cached]
+            )
+        )
+        todo = [text for text in phrases if hashes[text] not in cached]
+        computed = []
+        for done, doc in enumerate(
+            nlp.pipe(todo, batch_size=BATCH_SIZE, n_process=N_PROCESS), start=1
+        ):
+            computed.append(
+                (
+                    hashes[doc.text],
+                    [(t.text, t.pos_, t.lemma_, t.whitespace_) for t in doc],
+                )
+            )
+            if progress is not None and done % BATCH_SIZE == 0:
+                progress(done / len(todo))
+        self.store.put_many(model, computed)
+        cached.update(computed)
+        annotations = {text: cached[hashes[text]] for text in phrases}
+        with self._lock:
+            self._decks[(digest, model)] = annotations
+            while len(self._decks) > MEMORY_DECKS:
+                self._decks.popitem(last=False)
+        return annotations
+
+
+annotator = Annotator()
@@ -4,10 +4,29 @@ app_components
 ⚙ This module holds all the components of `translate-that` streamlit app
 """
 
+import os
+import random
+import time
 import streamlit as st
-import pandas as pd
 import numpy as np
+import pandas as pd
 from streamlit.delta_generator import DeltaGenerator
+from annotated_text import annotated_text
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from components.deck_cache import deck_cache
+from components.deck_registry import deck_registry
+from components.ingest import REQUIRED_COLUMNS, load_deck
+from components.deck_format import compile_deck, compiled_path, open_deck
+from components.deck import Deck, DeckDiff, DeckView, diff_decks
+from components.normalize import normalize
+from components.grading import Grade, grade, mark_20
+from components.scheduler import Scheduler
+from components.sampler import RandomSampler
+from components.progress import get_progress_store
+from components.events import get_card_stats, get_event_log
+from components.profiling import profiler
+from components.annotate import MODELS, annotator
+from components.precompute import precomputer
 
 
 def page_config() -> None:
@@ -94,28 +113,57 @@ def set_title(selected_language: str) -> DeltaGenerator:
     return st.title(title)
 
 
+def parse_data(file) -> pd.DataFrame:
+    """Parse le fichier uploadé selon son extension, en streaming et avec une barre de progression."""
+    suffix = file.name.rsplit(".", 1)[-1].lower()
+    if suffix not in ("csv", "xlsx", "xls"):
+        st.error(
+            "Format de fichier non pris en charge. Veuillez utiliser un fichier CSV ou Excel."
+        )
+        return None
+    progress_bar = st.progress(0.0)
+    data = load_deck(file, suffix, progress=progress_bar.progress)
+    progress_bar.empty()
+    return data
+
+
+def load_compiled_or_parse(file, digest: str) -> pd.DataFrame:
+    """Ouvre le deck compilé s'il existe, sinon parse le fichier puis le compile."""
+    path = compiled_path(digest)
+    if not path.exists():
+        data = parse_data(file)
+        if check_columns(data):
+            compile_deck(data, path)
+    if path.exists():
+        # colonnes adossées au mmap du deck compilé : ses pages sont partagées entre sessions
+        # et processus, et le DataFrame parsé est libéré
+        data = open_deck(path).to_dataframe()
+    if data is not None:
+        data.attrs["digest"] = digest
+        data.attrs["name"] = file.name
+    return data
+
+
+@profiler.timed
 def load_data(file) -> pd.DataFrame:
-    """Permet de charger les données qui ont été uploadées."""
+    """Permet de charger les données qui ont été uploadées.
+
+    Les decks déjà parsés sont servis depuis le cache (clé = hash du contenu), ce qui évite de
+    re-parser le fichier à chaque rerun. Un deck déjà vu est rouvert depuis sa version compilée.
+    """
     if file is not None:
-        if file.name.endswith(".csv"):
-            data = pd.read_csv(file)
-        elif file.name.endswith(".xlsx") or file.name.endswith(".xls"):
-            data = pd.read_excel(file)
-        else:
-            st.error(
-                "Format de fichier non pris en charge. Veuillez utiliser un fichier CSV ou Excel."
-            )
-            return None
-        return data
+        suffix = file.name.rsplit(".", 1)[-1].lower()
+        return deck_cache.get_or_load(
+            file.getvalue(), suffix, lambda digest: load_compiled_or_parse(file, digest)
+        )
     return None
 
 
+@profiler.timed
 def check_columns(data: pd.DataFrame) -> bool:
     """Permet de vérifier que les colonnes French & English existent dans le fichier."""
-    valid_col_1 = "French"
-    valid_col_2 = "English"
     if data is not None:
-        if valid_col_1 and valid_col_2 not in data.columns:
+        if not all(col in data.columns for col in REQUIRED_COLUMNS):
             return False
         else:
             return True
@@ -143,17 +191,30 @@ def text_placeholder(data: pd.DataFrame, selected_language: str):
         return None
 
 
+@profiler.timed
 def select_mode(data: pd.DataFrame, selected_language: str) -> str:
-    """Permet de choisir entre 3 modes : apprentissage, texte aléatoire, et session d'entrainement."""
+    """Permet de choisir entre 5 modes : apprentissage, texte aléatoire, session d'entrainement, répétition espacée et QCM."""
     if data is None:
         return None
     else:
         if selected_language == "FR":
             label = "Sélectionner le mode"
-            options = ("📚 Apprentissage", "🎲 Texte aléatoire", "🏋️‍♂️ Entraînement")
+            options = (
+                "📚 Apprentissage",
+                "🎲 Texte aléatoire",
+                "🏋️‍♂️ Entraînement",
+                "🧠 Répétition espacée",
+                "🔤 QCM",
+            )
         else:
             label = "Select a mode"
-            options = ("📚 Learning", "🎲 Random text", "🏋️‍♂️ Training session")
+            options = (
+                "📚 Learning",
+                "🎲 Random text",
+                "🏋️‍♂️ Training session",
+                "🧠 Spaced repetition",
+                "🔤 Multiple choice",
+            )
         return st.sidebar.selectbox(label, options)
 
 
@@ -168,45 +229,373 @@ def display_author(selected_language: str):
     )
 
 
-def display_data(data: pd.DataFrame, selected_language: str):
-    """Permet d'afficher les données sous forme de table."""
+PAGE_SIZES = (25, 50, 100, 250, 500)
+PAGE_SIZE = int(os.environ.get("TRANSLATE_THAT_PAGE_SIZE", 50))
+
+
+@profiler.timed
+def display_data(data: pd.DataFrame, selected_language: str, deck: Deck):
+    """Permet d'afficher les données sous forme de table, page par page.
+
+    La recherche passe par l'index de mots du deck (`deck.search_index`) : aucune frappe ne
+    parcourt tout le deck, et seule la page visible est envoyée au navigateur.
+    """
     if data is not None:
         if selected_language == "FR":
             subheader = "📚 Mode Apprentissage"
             caption = "Apprendre vite, apprendre efficacement, et surtout : **ludiquement** ! Un mot ? Une expression ? Une phrase ? Sa traduction."
             text = f"- Nombre total d'expressions à apprendre : *{len(data)}*"
+            search_label = "🔎 Rechercher un mot (français ou anglais)"
+            page_size_label = "Lignes par page"
+            page_label = "Page"
+            results = "- Résultats : *{}*"
+            indexing = "⏳ Indexation du deck en cours..."
             column_order = ["French", "English"]
         else:
             subheader = "📚 Learning Mode"
             caption = "Learn faster, more effectively, and **joyfully**! A word? An expression? A sentence? Its translation."
             text = f"- Total number of expressions : *{len(data)}*"
+            search_label = "🔎 Search a word (French or English)"
+            page_size_label = "Rows per page"
+            page_label = "Page"
+            results = "- Results : *{}*"
+            indexing = "⏳ Indexing the deck..."
             column_order = ["English", "French"]
-        return (
-            st.subheader(subheader),
-            st.caption(caption),
-            st.write(text),
-            st.data_editor(data, column_order=column_order, hide_index=True),
+        st.subheader(subheader)
+        st.caption(caption)
+        st.write(text)
+
+        ready = deck.ready("search_index")
+        query = st.text_input(
+            search_label,
+            key="learning_search",
+            disabled=not ready,
+            placeholder=None if ready else indexing,
+        ).strip()
+        rows = deck.search_index.search(query) if query and ready else None
+        total = len(data) if rows is None else len(rows)
+        if query:
+            st.write(results.format(total))
+
+        size_column, page_column = st.columns(2)
+        page_size = size_column.selectbox(
+            page_size_label,
+            PAGE_SIZES,
+            index=PAGE_SIZES.index(PAGE_SIZE) if PAGE_SIZE in PAGE_SIZES else 1,
+            key="page_size",
+        )
+        pages = max(1, -(-total // page_size))
+        # une nouvelle recherche repart de la première page, et la page reste dans les bornes
+        if st.session_state.get("learning_query") != query:
+            st.session_state.learning_query = query
+            st.session_state.page = 1
+        elif st.session_state.get("page", 1) > pages:
+            st.session_state.page = pages
+        page = page_column.number_input(
+            f"{page_label} (/ {pages})",
+            min_value=1,
+            max_value=pages,
+            step=1,
+            key="page",
+        )
+
+        start = (page - 1) * page_size
+        if rows is None:
+            visible = data.iloc[start : start + page_size]
+        else:
+            visible = data.iloc[rows[start : start + page_size]]
+        return st.data_editor(visible, column_order=column_order, hide_index=True)
+
+
+@profiler.timed
+def get_deck(data: pd.DataFrame) -> Deck:
+    """Renvoie le Deck partagé entre toutes les sessions qui utilisent le même fichier.
+
+    La session garde un bail (`deck_lease`) sur le deck du registre : il est rendu quand la
+    session change de fichier ou se termine. Les index du deck sont construits en arrière-plan.
+    """
+    digest = data.attrs["digest"]
+    lease = st.session_state.get("deck_lease")
+    if lease is None or lease.digest != digest:
+        ctx = get_script_run_ctx()
+        session_id = ctx.session_id if ctx is not None else "local"
+        st.session_state.deck_lease = deck_registry.acquire(digest, data, session_id)
+        reload_deck(st.session_state.deck_lease.deck, data, lease)
+        if lease is not None:
+            lease.release()
+    deck = st.session_state.deck_lease.deck
+    precomputer.schedule(deck)
+    return deck
+
+
+# part minimale des cartes d'une version connue à retrouver dans un fichier homonyme d'une autre
+# session : en dessous, c'est un autre deck qui porte le même nom (ex: deux `vocab.xlsx`)
+VERSION_OVERLAP = float(os.environ.get("TRANSLATE_THAT_VERSION_OVERLAP", 0.5))
+# attente maximale (en secondes) de la migration de la progression pendant un rerun : au-delà,
+# la session reprend sans elle plutôt que de rester bloquée
+FLUSH_TIMEOUT = 5.0
+
+
+def previous_version(
+    deck: Deck, data: pd.DataFrame, lease
+) -> tuple[Deck, DeckDiff] | None:
+    """Retrouve la version précédente d'un fichier de deck et l'appariement de leurs cartes.
+
+    - le fichier précédent de la session, s'il a le même nom et au moins une carte en commun
+    - sinon, parmi les dernières versions connues du nom (en mémoire, ou rouvertes depuis leur
+      version compilée), celle qui partage le plus de cartes, au moins `VERSION_OVERLAP`
+
+    Renvoie None si le fichier n'est la nouvelle version d'aucun deck connu.
+    """
+    name = data.attrs.get("name")
+    known = get_progress_store().deck_versions(name)
+    if any(digest == deck.digest for digest, _ in known):
+        return None
+    if lease is not None and st.session_state.get("deck_name") == name:
+        diff = diff_decks(lease.deck, deck)
+        if diff.overlap > 0:
+            return lease.deck, diff
+    best = None
+    for digest, source in known:
+        previous = deck_registry.find_deck(digest)
+        if previous is None and compiled_path(source).exists():
+            previous = Deck.from_dataframe(
+                open_deck(compiled_path(source)).to_dataframe()
+            )
+        if previous is None:
+            continue
+        diff = diff_decks(previous, deck)
+        if diff.overlap >= VERSION_OVERLAP and (
+            best is None or diff.overlap > best[1].overlap
+        ):
+            best = previous, diff
+    return best
+
+
+def reload_deck(deck: Deck, data: pd.DataFrame, lease) -> None:
+    """Rattache un fichier ré-importé (même nom, contenu modifié) à sa version précédente.
+
+    Les cartes sont appariées par empreinte de ligne (`DeckDiff`) :
+
+    - seules les lignes ajoutées ou modifiées sont recalculées (normalisation, index, annotations)
+    - la progression enregistrée et l'historique des réponses suivent chaque carte
+    - l'état de la session (position, tirages, révisions) est reporté sur la nouvelle version
+
+    Un fichier sans version précédente (`previous_version`) commence sa propre lignée.
+    """
+    name = data.attrs.get("name")
+    found = previous_version(deck, data, lease) if name is not None else None
+    st.session_state.deck_name = name
+    store = get_progress_store()
+    if found is None:
+        if name is not None:
+            store.set_deck_version(name, deck.digest, data.attrs["digest"])
+        return
+    previous, diff = found
+    precomputer.inherit(deck, previous, diff)
+    store.remap_deck(
+        name,
+        previous.digest,
+        deck.digest,
+        data.attrs["digest"],
+        diff.mapping.tolist(),
+        diff.positions.tolist(),
+    )
+    # la reprise de la progression (`resume_training`) doit lire les données migrées
+    store.flush(FLUSH_TIMEOUT)
+    remap_session(previous, deck, diff)
+
+
+def remap_session(previous: Deck, deck: Deck, diff: DeckDiff) -> None:
+    """Reporte l'état de la session sur la nouvelle version du deck."""
+    state = st.session_state
+    if state.get("scheduler_deck") is previous:
+        state.scheduler = state.scheduler.remap(diff.mapping, len(deck))
+        state.scheduler_deck = deck
+        state.srs_card = state.scheduler.next_card()
+    if state.get("sampler_deck") is previous:
+        state.sampler = state.sampler.remap(diff.mapping, len(deck))
+        state.sampler_deck = deck
+    if "random_index" in state and state.random_index < len(diff):
+        card = int(diff.mapping[state.random_index])
+        if card < 0:
+            state.pop("random_word", None)
+        else:
+            state.random_index = card
+    if state.get("active_deck") is previous:
+        state.active_deck = deck
+        if "index" in state and state.index < len(diff):
+            position = int(diff.positions[state.index])
+            if position < 0:
+                # plus aucune carte après la position : la session repart du début
+                for key in ("index", "score"):
+                    state.pop(key, None)
+            else:
+                state.index = position
+            state.pop("next_word", None)
+        state.pop("choice_card", None)
+    user = state.get("username", "").strip()
+    if user:
+        state.resumed = (user, deck.digest)
+
+
+@profiler.timed
+def filter_deck(deck: Deck, selected_language: str) -> Deck | DeckView:
+    """Permet de restreindre les modes texte aléatoire et entraînement aux cartes d'une recherche.
+
+    La vue est construite à partir de l'index de trigrammes du deck partagé (aucune copie ni
+    parcours du DataFrame) et gardée en session tant que la recherche ne change pas.
+    """
+    if selected_language == "FR":
+        label = "🔎 Filtrer les cartes"
+        help = "Seules les cartes contenant ce texte (en français ou en anglais) sont proposées. À défaut, les cartes les plus proches."
+        empty = "Aucune carte ne correspond au filtre : tout le deck est utilisé."
+        indexing = "⏳ Indexation du deck en cours..."
+    else:
+        label = "🔎 Filter cards"
+        help = "Only cards containing this text (in French or English) are shown. Failing that, the closest cards."
+        empty = "No card matches the filter: the whole deck is used."
+        indexing = "⏳ Indexing the deck..."
+    ready = deck.ready("trigram_index")
+    query = st.sidebar.text_input(
+        label,
+        help=help,
+        key="card_filter",
+        disabled=not ready,
+        placeholder=None if ready else indexing,
+    ).strip()
+    active = deck
+    if query and ready:
+        view = st.session_state.get("deck_view")
+        if view is None or view.deck is not deck or view.query != query:
+            view = deck.subset(query)
+            st.session_state.deck_view = view
+        if len(view):
+            active = view
+        else:
+            st.sidebar.warning(empty)
+    # un autre jeu de cartes : les textes et la position en cours ne sont plus valables
+    if st.session_state.get("active_deck") is not active:
+        st.session_state.active_deck = active
+        for key in ("random_word", "next_word", "index", "score", "choice_card"):
+            st.session_state.pop(key, None)
+    return active
+
+
+def get_sampler(deck: Deck) -> RandomSampler:
+    """Crée le sampler du mode texte aléatoire une seule fois par deck (et par pseudo) et le garde
+    en session.
+
+    Avec un pseudo, le sampler reprend l'historique persistant des réponses : le tirage pondéré
+    revient d'emblée sur les cartes ratées lors des sessions précédentes.
+    """
+    user = st.session_state.get("username", "").strip()
+    if (
+        st.session_state.get("sampler_deck") is not deck
+        or st.session_state.get("sampler_user") != user
+    ):
+        sampler = RandomSampler(len(deck))
+        history = (
+            get_progress_store().card_history(user, deck.base.digest) if user else []
         )
+        if history:
+            rows, attempts, errors = np.array(history, dtype=np.int64).T
+            cards = deck.cards(rows)
+            known = cards >= 0
+            sampler.restore(cards[known], attempts[known], errors[known])
+        st.session_state.sampler_deck = deck
+        st.session_state.sampler_user = user
+        st.session_state.sampler = sampler
+    return st.session_state.sampler
 
 
-def get_random_word(data: pd.DataFrame, selected_language: str) -> tuple[str, str]:
-    """Récupère un mot aléatoire grâce à un index aléatoire dans le dataframe."""
+def select_sampling(selected_language: str) -> bool:
+    """Permet de choisir entre un tirage sans répétition et un tirage pondéré par les erreurs."""
     if selected_language == "FR":
-        random_index = np.random.randint(len(data))
-        return data.iloc[random_index]["French"], data.iloc[random_index]["English"]
+        label = "🎯 Privilégier les textes ratés"
+        help = "Les textes souvent ratés sont tirés plus souvent. Sinon, tout le deck est parcouru sans répétition."
     else:
-        random_index = np.random.randint(len(data))
-        return data.iloc[random_index]["English"], data.iloc[random_index]["French"]
+        label = "🎯 Focus on missed texts"
+        help = "Often missed texts are drawn more often. Otherwise, the whole deck is covered without repeats."
+    return st.sidebar.toggle(label, help=help, key="weighted_sampling")
+
+
+def select_user(selected_language: str) -> str:
+    """Permet d'entrer un pseudo pour sauvegarder sa progression (vide = pas de sauvegarde)."""
+    if selected_language == "FR":
+        label = "👤 Pseudo"
+        help = "Renseigner un pseudo permet de retrouver sa progression après un rafraîchissement."
+    else:
+        label = "👤 Username"
+        help = "Enter a username to get your progress back after a refresh."
+    return st.sidebar.text_input(label, help=help, key="username").strip()
+
+
+def card_shown(mode: str, card: int) -> None:
+    """Note l'instant où la carte est affichée, pour mesurer le temps de réponse."""
+    if st.session_state.get("shown_card") != (mode, card):
+        st.session_state.shown_card = (mode, card)
+        st.session_state.shown_at = time.time()
+
+
+def record_answer(deck: Deck, card: int, mode: str, correct: bool, answer: str) -> None:
+    """Ajoute la réponse au journal des réponses et, avec un pseudo, à l'historique persistant
+    de l'utilisateur (écritures différées)."""
+    user = st.session_state.get("username", "").strip()
+    now = time.time()
+    get_event_log().record(
+        user,
+        deck.base.digest,
+        deck.row(card),
+        mode,
+        answer,
+        correct,
+        now - st.session_state.get("shown_at", now),
+    )
+    # une nouvelle tentative sur la même carte est chronométrée depuis celle-ci
+    st.session_state.shown_at = now
+    if user:
+        get_progress_store().record_answer(
+            user, deck.base.digest, deck.row(card), mode, correct
+        )
 
 
-def check_session_state(data: pd.DataFrame, selected_language: str) -> None:
+def save_training_position(deck: Deck) -> None:
+    """Sauvegarde (en différé) la position et le score de la session d'entraînement."""
+    user = st.session_state.get("username", "").strip()
+    if user:
+        get_progress_store().save_position(
+            user, deck.digest, st.session_state.index, st.session_state.score
+        )
+
+
+def resume_training(deck: Deck) -> None:
+    """Restaure la position et le score sauvegardés, une seule fois par utilisateur et par deck."""
+    user = st.session_state.get("username", "").strip()
+    if not user or st.session_state.get("resumed") == (user, deck.digest):
+        return
+    st.session_state.resumed = (user, deck.digest)
+    saved = get_progress_store().load_position(user, deck.digest)
+    if saved is not None:
+        st.session_state.index, st.session_state.score = saved
+        st.session_state.pop("next_word", None)
+
+
+def get_random_word(deck: Deck, selected_language: str) -> tuple[str, str]:
+    """Récupère un mot aléatoire tiré par le sampler de la session."""
+    st.session_state.random_index = get_sampler(deck).draw()
+    return deck.card(st.session_state.random_index, selected_language)
+
+
+def check_session_state(deck: Deck, selected_language: str) -> None:
     if "random_word" not in st.session_state:
         (
             st.session_state.random_word,
             st.session_state.correct_translation,
-        ) = get_random_word(data, selected_language)
+        ) = get_random_word(deck, selected_language)
 
 
+@profiler.timed
 def userform(selected_language: str) -> tuple[str, bool, bool]:
     """Crée la userform permettant à l'utilisateur d'entrer sa réponse et de changer pour obtenir un nouveau mot."""
     if selected_language == "FR":
@@ -230,6 +619,7 @@ def userform(selected_language: str) -> tuple[str, bool, bool]:
     return user_translation, submit, clear
 
 
+@profiler.timed
 def rand_text_subheader(selected_language: str):
     """Crée le texte du mode random text."""
     if st.session_state.random_word.count(" ") == 0:
@@ -247,13 +637,96 @@ def rand_text_subheader(selected_language: str):
     return st.subheader(subheader), st.markdown(markdown)
 
 
-def post_submit(selected_language: str, user_translation: str) -> DeltaGenerator:
+POS_COLORS = {
+    "NOUN": "#8ef",
+    "PROPN": "#d8f",
+    "VERB": "#faa",
+    "AUX": "#fcc",
+    "ADJ": "#afa",
+    "ADV": "#fea",
+}
+
+
+@profiler.timed
+def display_annotation(deck: Deck, text: str, selected_language: str):
+    """Affiche le texte à traduire annoté (nature et lemme des mots) si l'option est activée.
+
+    Tout le deck est annoté en arrière-plan au premier usage, par lots `nlp.pipe` et avec un
+    cache disque : les reruns suivants ne font qu'une recherche dans un dictionnaire.
+    """
+    if selected_language == "FR":
+        label = "🏷 Annoter les textes"
+        help = "Affiche la nature (nom, verbe, ...) et le lemme des mots du texte à traduire."
+        missing = (
+            "Le modèle spaCy `{}` n'est pas installé : `python -m spacy download {}`"
+        )
+    else:
+        label = "🏷 Annotate texts"
+        help = "Shows the part of speech (noun, verb, ...) and the lemma of the words to translate."
+        missing = "The spaCy model `{}` is not installed: `python -m spacy download {}`"
+    if not st.sidebar.toggle(label, help=help, key="annotate"):
+        return None
+    column = "French" if selected_language == "FR" else "English"
+    base = deck.base
+    if MODELS[column] in annotator.missing:
+        return st.sidebar.warning(missing.format(MODELS[column], MODELS[column]))
+    annotations = annotator.cached(base.digest, column)
+    if annotations is None:
+        # annotation de tout le deck en arrière-plan : le texte reste affiché sans annotations
+        precomputer.submit(
+            base.digest,
+            f"annotations ({column})",
+            lambda progress: annotator.annotate(
+                base.digest, column, base.prompts(selected_language), progress
+            ),
+        )
+        return None
+    parts = []
+    for word, pos, lemma, space in annotations.get(text, []):
+        if pos in POS_COLORS:
+            tag = pos if lemma.casefold() == word.casefold() else f"{pos} · {lemma}"
+            parts.append((word, tag, POS_COLORS[pos]))
+        else:
+            parts.append(word)
+        if space:
+            parts.append(space)
+    return annotated_text(*parts) if parts else None
+
+
+def check_translation(deck: Deck, user_translation: str, expected: str) -> Grade:
+    """Note la traduction de l'utilisateur (normalisée) contre les traductions acceptées (pré-normalisées).
+
+    Les fautes de frappe légères sont tolérées (`Grade.CLOSE`).
+    """
+    return grade(normalize(user_translation), deck.accepted_answers(expected))
+
+
+@profiler.timed
+def post_submit(
+    selected_language: str, user_translation: str, deck: Deck
+) -> DeltaGenerator:
     """Affiche un message selon que la traduction soit bonne ou non."""
+    if user_translation.strip() != "":
+        result = check_translation(
+            deck, user_translation, st.session_state.correct_translation
+        )
+        get_sampler(deck).record(st.session_state.random_index, result != Grade.WRONG)
+        record_answer(
+            deck,
+            st.session_state.random_index,
+            "random",
+            result != Grade.WRONG,
+            user_translation,
+        )
     if selected_language == "FR":
         if user_translation.strip() == "":
             response = st.warning("🤷‍♀️ Aucune traduction n'a été entrée...")
-        elif user_translation.strip() == st.session_state.correct_translation:
+        elif result == Grade.EXACT:
             response = st.success("✅ Traduction correcte !")
+        elif result == Grade.CLOSE:
+            response = st.success(
+                f"✅ Traduction correcte, à une faute de frappe près ! Orthographe attendue : *{st.session_state.correct_translation}*"
+            )
         else:
             response = st.error(
                 f"❌ Traduction incorrecte ! La **traduction attendue** était : *{st.session_state.correct_translation}*"
@@ -261,8 +734,12 @@ def post_submit(selected_language: str, user_translation: str) -> DeltaGenerator
     else:
         if user_translation.strip() == "":
             response = st.warning("🤷‍♀️ No translation has been detected...")
-        elif user_translation.strip() == st.session_state.correct_translation:
+        elif result == Grade.EXACT:
             response = st.success("✅ Correct translation!")
+        elif result == Grade.CLOSE:
+            response = st.success(
+                f"✅ Correct translation, give or take a typo! Expected spelling : *{st.session_state.correct_translation}*"
+            )
         else:
             response = st.error(
                 f"❌ Incorrect translation! The **expected translation** was : *{st.session_state.correct_translation}*"
@@ -270,11 +747,15 @@ def post_submit(selected_language: str, user_translation: str) -> DeltaGenerator
     return response
 
 
-def random_text(data: pd.DataFrame, selected_language: str) -> tuple[str, bool, bool]:
+@profiler.timed
+def random_text(deck: Deck, selected_language: str) -> tuple[str, bool, bool]:
     """Orchestre l'ensemble des fonctions pour générer du texte aléatoire."""
-    if data is not None:
-        check_session_state(data, selected_language)
+    if deck is not None:
+        get_sampler(deck).weighted = select_sampling(selected_language)
+        check_session_state(deck, selected_language)
+        card_shown("random", st.session_state.random_index)
         rand_text_subheader(selected_language)
+        display_annotation(deck, st.session_state.random_word, selected_language)
         user_translation, submit, clear = userform(selected_language)
         return user_translation, submit, clear
     else:
@@ -285,21 +766,13 @@ def increment_index():
     st.session_state.index += 1
 
 
-def get_next_word(data: pd.DataFrame, selected_language: str) -> tuple[str, str]:
-    """Récupère le prochain mot grâce à un index dans le dataframe."""
-    if selected_language == "FR":
-        return (
-            data.iloc[st.session_state.index]["French"],
-            data.iloc[st.session_state.index]["English"],
-        )
-    else:
-        return (
-            data.iloc[st.session_state.index]["English"],
-            data.iloc[st.session_state.index]["French"],
-        )
+def get_next_word(deck: Deck, selected_language: str) -> tuple[str, str]:
+    """Récupère le prochain mot grâce à un index dans le deck."""
+    return deck.card(st.session_state.index, selected_language)
 
 
-def check_session_state_train(data: pd.DataFrame, selected_language: str) -> None:
+@profiler.timed
+def check_session_state_train(deck: Deck, selected_language: str) -> None:
     """Cette fonction permet de vérifier les différents states de la session active en session d'entrainement.
 
     Plus précisément :
@@ -312,9 +785,11 @@ def check_session_state_train(data: pd.DataFrame, selected_language: str) -> Non
         (
             st.session_state.next_word,
             st.session_state.correct_translation_train,
-        ) = get_next_word(data, selected_language)
+        ) = get_next_word(deck, selected_language)
+    card_shown("train", st.session_state.index)
 
 
+@profiler.timed
 def train_text_subheader(selected_language: str):
     """Crée le texte du mode train text."""
     if st.session_state.next_word.count(" ") == 0:
@@ -332,6 +807,7 @@ def train_text_subheader(selected_language: str):
     return st.subheader(subheader), st.markdown(markdown)
 
 
+@profiler.timed
 def userform_train(selected_language: str) -> tuple[str, bool, bool]:
     """Crée la userform permettant à l'utilisateur d'entrer sa réponse et de changer pour obtenir un nouveau mot."""
     if selected_language == "FR":
@@ -357,18 +833,33 @@ def userform_train(selected_language: str) -> tuple[str, bool, bool]:
     return user_translation, submit, clear
 
 
+@profiler.timed
 def post_submit_train(
-    selected_language: str, user_translation_train: str
+    selected_language: str, user_translation_train: str, deck: Deck
 ) -> DeltaGenerator:
     """Affiche un message selon que la traduction soit bonne ou non."""
+    if user_translation_train.strip() != "":
+        result = check_translation(
+            deck, user_translation_train, st.session_state.correct_translation_train
+        )
+        record_answer(
+            deck,
+            st.session_state.index,
+            "train",
+            result != Grade.WRONG,
+            user_translation_train,
+        )
     if selected_language == "FR":
         if user_translation_train.strip() == "":
             response = st.warning("🤷‍♀️ Aucune traduction n'a été entrée...")
-        elif (
-            user_translation_train.strip() == st.session_state.correct_translation_train
-        ):
+        elif result == Grade.EXACT:
             response = st.success("✅ Traduction correcte !")
             st.session_state.score += 1
+        elif result == Grade.CLOSE:
+            response = st.success(
+                f"✅ Traduction correcte, à une faute de frappe près ! Orthographe attendue : *{st.session_state.correct_translation_train}*"
+            )
+            st.session_state.score += 1
         else:
             response = st.error(
                 f"❌ Traduction incorrecte ! La **traduction attendue** était : *{st.session_state.correct_translation_train}*"
@@ -376,11 +867,14 @@ def post_submit_train(
     else:
         if user_translation_train.strip() == "":
             response = st.warning("🤷‍♀️ No translation has been detected...")
-        elif (
-            user_translation_train.strip() == st.session_state.correct_translation_train
-        ):
+        elif result == Grade.EXACT:
             response = st.success("✅ Correct translation!")
             st.session_state.score += 1
+        elif result == Grade.CLOSE:
+            response = st.success(
+                f"✅ Correct translation, give or take a typo! Expected spelling : *{st.session_state.correct_translation_train}*"
+            )
+            st.session_state.score += 1
         else:
             response = st.error(
                 f"❌ Incorrect translation! The **expected translation** was : *{st.session_state.correct_translation_train}*"
@@ -388,14 +882,14 @@ def post_submit_train(
     return response
 
 
-def index_writer_train(data: pd.DataFrame, selected_language: str) -> DeltaGenerator:
+def index_writer_train(deck: Deck, selected_language: str) -> DeltaGenerator:
     """Permet d'écrire l'index en cours d'utilisation dans le mode train."""
     if selected_language == "FR":
         text = "Indice actuel"
     else:
         text = "Current index"
     return st.write(
-        f"⚙ {text} $\Rightarrow$ {st.session_state.index}/**{len(data)-1}**"
+        f"⚙ {text} $\Rightarrow$ {st.session_state.index}/**{len(deck)-1}**"
     )
 
 
@@ -408,9 +902,10 @@ def score_writer_train(selected_language: str) -> DeltaGenerator:
     return st.write(f"🏆 {text} $\Rightarrow$ `{st.session_state.score}`")
 
 
-def final_scorer(data: pd.DataFrame):
+@profiler.timed
+def final_scorer(deck: Deck):
     """Permet de générer le score final /20."""
-    score_20 = round(st.session_state.score / len(data) * 20, 2)
+    score_20 = mark_20(st.session_state.score, len(deck))
     if score_20 < 1.7:
         st.error(
             f"🔫 Score final : {score_20}/20 $-$ **Affligeant**. Même *Anne Hidalgo* a eu un meilleur score aux présidentielles 😂"
@@ -459,3 +954,424 @@ def final_scorer(data: pd.DataFrame):
         st.success(
             f"🥇 Score final : {score_20}/20 $-$ **Excellent**. Aussi bon que moi, mais pas meilleur."
         )
+
+
+GRADE_QUALITY = {Grade.EXACT: 5, Grade.CLOSE: 4, Grade.WRONG: 1}
+
+
+def get_scheduler(deck: Deck) -> Scheduler:
+    """Crée le planificateur SM-2 du deck une seule fois et le garde en session."""
+    if st.session_state.get("scheduler_deck") is not deck:
+        st.session_state.scheduler_deck = deck
+        st.session_state.scheduler = Scheduler(len(deck))
+        st.session_state.srs_card = st.session_state.scheduler.next_card()
+        st.session_state.srs_answered = False
+        st.session_state.srs_reviews = 0
+    return st.session_state.scheduler
+
+
+def next_srs_card():
+    """Passe à la carte suivante : une carte passée sans réponse est considérée comme ratée."""
+    scheduler = st.session_state.scheduler
+    if not st.session_state.srs_answered:
+        scheduler.review(st.session_state.srs_card, 0)
+        st.session_state.srs_reviews += 1
+    st.session_state.srs_card = scheduler.next_card()
+    st.session_state.srs_answered = False
+
+
+@profiler.timed
+def srs_text_subheader(deck: Deck, selected_language: str):
+    """Crée le texte du mode répétition espacée."""
+    word, _ = deck.card(st.session_state.srs_card, selected_language)
+    if word.count(" ") == 0:
+        type_fr, type_en = "du mot", "from the word"
+    elif word.count(" ") < 4:
+        type_fr, type_en = "de l'expression", "from the expression"
+    else:
+        type_fr, type_en = "de la phrase", "from the sentence"
+    if selected_language == "FR":
+        subheader = "🧠 Répétition espacée"
+        markdown = (
+            f"> Veuillez entrer la traduction {type_fr} : `{word}` en **Anglais**"
+        )
+    else:
+        subheader = "🧠 Spaced repetition"
+        markdown = f"> Please enter the translation {type_en} : `{word}` in **French**"
+    return st.subheader(subheader), st.markdown(markdown)
+
+
+@profiler.timed
+def userform_srs(selected_language: str) -> tuple[str, bool, bool]:
+    """Crée la userform du mode répétition espacée."""
+    if selected_language == "FR":
+        with st.form("myform", clear_on_submit=True):
+            user_translation = st.text_input("🖍 Ma traduction en anglais", key="trad")
+            col1, col2 = st.columns([1, 1])
+            with col1:
+                submit = st.form_submit_button(label="📤 Envoyer ma réponse")
+            with col2:
+                next_card = st.form_submit_button(
+                    label="🆕 Obtenir la prochaine carte", on_click=next_srs_card
+                )
+    else:
+        with st.form("myform", clear_on_submit=True):
+            user_translation = st.text_input("🖍 My translation in french", key="trad")
+            col1, col2 = st.columns([1, 1])
+            with col1:
+                submit = st.form_submit_button(label="📤 Send my answer")
+            with col2:
+                next_card = st.form_submit_button(
+                    label="🆕 Get the next card", on_click=next_srs_card
+                )
+    return user_translation, submit, next_card
+
+
+@profiler.timed
+def post_submit_srs(
+    selected_language: str, user_translation: str, deck: Deck, scheduler: Scheduler
+) -> DeltaGenerator:
+    """Note la réponse, replanifie la carte (une seule fois par carte) et affiche le résultat."""
+    card = st.session_state.srs_card
+    _, expected = deck.card(card, selected_language)
+    if user_translation.strip() == "":
+        if selected_language == "FR":
+            return st.warning("🤷‍♀️ Aucune traduction n'a été entrée...")
+        return st.warning("🤷‍♀️ No translation has been detected...")
+    result = check_translation(deck, user_translation, expected)
+    if not st.session_state.srs_answered:
+        scheduler.review(card, GRADE_QUALITY[result])
+        st.session_state.srs_answered = True
+        st.session_state.srs_reviews += 1
+    if selected_language == "FR":
+        if result == Grade.WRONG:
+            return st.error(
+                f"❌ Traduction incorrecte ! La **traduction attendue** était : *{expected}*"
+            )
+        return st.success(f"✅ Traduction correcte ! *{expected}*")
+    else:
+        if result == Grade.WRONG:
+            return st.error(
+                f"❌ Incorrect translation! The **expected translation** was : *{expected}*"
+            )
+        return st.success(f"✅ Correct translation! *{expected}*")
+
+
+def reviews_writer_srs(selected_language: str) -> DeltaGenerator:
+    """Permet d'écrire le nombre de révisions de la session en mode répétition espacée."""
+    if selected_language == "FR":
+        text = "Révisions"
+    else:
+        text = "Reviews"
+    return st.write(f"🔁 {text} $\\Rightarrow$ `{st.session_state.srs_reviews}`")
+
+
+CHOICE_COUNT = 4
+
+
+def get_choices(deck: Deck, card: int, selected_language: str) -> list[str]:
+    """Options du QCM : la traduction attendue et des distracteurs tirés du même deck.
+
+    Les distracteurs sont les réponses les plus proches (trigrammes communs) de la traduction
+    attendue. Tant que l'index des textes proches n'est pas prêt (construit en arrière-plan),
+    ils sont tirés au hasard.
+    """
+    base, row = deck.base, deck.row(card)
+    _, expected = base.card(row, selected_language)
+    answers = base.answers(selected_language)
+    accepted = set(base.accepted_answers(expected))
+    rows = []
+    if base.neighbours_ready(selected_language):
+        rows = base.neighbour_index(selected_language).nearest(row, CHOICE_COUNT + 2)
+        # une réponse proche qui est aussi une traduction acceptée rendrait la question ambiguë
+        rows = [
+            other
+            for other in rows.tolist()
+            if normalize(answers[other]) not in accepted
+        ][: CHOICE_COUNT - 1]
+    else:
+        column = "English" if selected_language == "FR" else "French"
+        precomputer.submit(
+            base.digest,
+            f"neighbour_index ({column})",
+            lambda _: base.neighbour_index(selected_language),
+        )
+    options = [expected] + [answers[other] for other in rows]
+    # complète au hasard (index en construction, ou trop peu de réponses proches et distinctes)
+    for other in random.sample(range(len(base)), min(len(base), 8 * CHOICE_COUNT)):
+        if len(options) == CHOICE_COUNT:
+            break
+        text = answers[other]
+        if text and text not in options and normalize(text) not in accepted:
+            options.append(text)
+    random.shuffle(options)
+    return options
+
+
+def new_choice_card(deck: Deck, selected_language: str) -> None:
+    """Tire une nouvelle question du QCM (avec le sampler du mode texte aléatoire)."""
+    card = get_sampler(deck).draw()
+    st.session_state.choice_card = card
+    st.session_state.choice_language = selected_language
+    st.session_state.choice_options = get_choices(deck, card, selected_language)
+    st.session_state.choice_answered = False
+
+
+def check_session_state_choice(deck: Deck, selected_language: str) -> None:
+    """Vérifie les states du QCM : question en cours, options, score et nombre de questions."""
+    if (
+        "choice_card" not in st.session_state
+        or st.session_state.get("choice_language") != selected_language
+    ):
+        new_choice_card(deck, selected_language)
+    if "choice_score" not in st.session_state:
+        st.session_state.choice_score = 0
+        st.session_state.choice_total = 0
+    card_shown("choice", st.session_state.choice_card)
+
+
+@profiler.timed
+def choice_text_subheader(deck: Deck, selected_language: str):
+    """Crée le texte du mode QCM."""
+    word, _ = deck.card(st.session_state.choice_card, selected_language)
+    if word.count(" ") == 0:
+        type_fr, type_en = "du mot", "of the word"
+    elif word.count(" ") < 4:
+        type_fr, type_en = "de l'expression", "of the expression"
+    else:
+        type_fr, type_en = "de la phrase", "of the sentence"
+    if selected_language == "FR":
+        subheader = "🔤 QCM"
+        markdown = (
+            f"> Veuillez choisir la traduction {type_fr} : `{word}` en **Anglais**"
+        )
+    else:
+        subheader = "🔤 Multiple choice"
+        markdown = f"> Please choose the translation {type_en} : `{word}` in **French**"
+    return st.subheader(subheader), st.markdown(markdown)
+
+
+@profiler.timed
+def userform_choice(selected_language: str) -> tuple[str | None, bool, bool]:
+    """Crée la userform du QCM : une option à cocher, puis envoyer ou passer à la question suivante."""
+    if selected_language == "FR":
+        label, send, next_label = (
+            "🖍 Ma traduction en anglais",
+            "📤 Envoyer ma réponse",
+            "🆕 Obtenir une nouvelle question",
+        )
+    else:
+        label, send, next_label = (
+            "🖍 My translation in french",
+            "📤 Send my answer",
+            "🆕 Get a new question",
+        )
+    with st.form("myform", clear_on_submit=True):
+        choice = st.radio(
+            label, st.session_state.choice_options, index=None, key="choice"
+        )
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            submit = st.form_submit_button(label=send)
+        with col2:
+            next_question = st.form_submit_button(label=next_label)
+    return choice, submit, next_question
+
+
+@profiler.timed
+def multiple_choice(
+    deck: Deck, selected_language: str
+) -> tuple[str | None, bool, bool]:
+    """Orchestre l'ensemble des fonctions du mode QCM."""
+    get_sampler(deck).weighted = select_sampling(selected_language)
+    check_session_state_choice(deck, selected_language)
+    choice_text_subheader(deck, selected_language)
+    display_annotation(
+        deck,
+        deck.card(st.session_state.choice_card, selected_language)[0],
+        selected_language,
+    )
+    return userform_choice(selected_language)
+
+
+@profiler.timed
+def post_submit_choice(
+    selected_language: str, choice: str | None, deck: Deck
+) -> DeltaGenerator:
+    """Note l'option choisie (une seule fois par question) et affiche le résultat."""
+    card = st.session_state.choice_card
+    _, expected = deck.card(card, selected_language)
+    if choice is None:
+        if selected_language == "FR":
+            return st.warning("🤷‍♀️ Aucune réponse n'a été choisie...")
+        return st.warning("🤷‍♀️ No answer has been chosen...")
+    correct = choice == expected
+    if not st.session_state.choice_answered:
+        st.session_state.choice_answered = True
+        st.session_state.choice_total += 1
+        st.session_state.choice_score += correct
+        get_sampler(deck).record(card, correct)
+        record_answer(deck, card, "choice", correct, choice)
+    if selected_language == "FR":
+        if not correct:
+            return st.error(
+                f"❌ Mauvaise réponse ! La **traduction attendue** était : *{expected}*"
+            )
+        return st.success(f"✅ Bonne réponse ! *{expected}*")
+    else:
+        if not correct:
+            return st.error(
+                f"❌ Wrong answer! The **expected translation** was : *{expected}*"
+            )
+        return st.success(f"✅ Right answer! *{expected}*")
+
+
+def score_writer_choice(selected_language: str) -> DeltaGenerator:
+    """Permet d'écrire le score du QCM (bonnes réponses / questions répondues)."""
+    if selected_language == "FR":
+        text = "Score actuel"
+    else:
+        text = "Current score"
+    return st.write(
+        f"🏆 {text} $\\Rightarrow$ `{st.session_state.choice_score}/{st.session_state.choice_total}`"
+    )
+
+
+INDEX_LABELS = {
+    "FR": {
+        "inherit": "reprise de la version précédente",
+        "normalized": "normalisation des textes",
+        "answer_index": "réponses normalisées",
+        "trigram_index": "filtre des cartes",
+        "search_index": "recherche",
+        "neighbour_index (English)": "distracteurs du QCM",
+        "neighbour_index (French)": "distracteurs du QCM",
+    },
+    "GB": {
+        "inherit": "previous version reuse",
+        "normalized": "text normalization",
+        "answer_index": "normalized answers",
+        "trigram_index": "card filter",
+        "search_index": "search",
+        "neighbour_index (English)": "multiple choice distractors",
+        "neighbour_index (French)": "multiple choice distractors",
+    },
+}
+
+
+@st.fragment(run_every=1)
+def _index_progress(digest: str, selected_language: str) -> None:
+    """Met à jour l'avancement chaque seconde, puis relance l'app quand tout est prêt."""
+    pending = precomputer.pending(digest)
+    if not pending:
+        st.rerun()
+    title = (
+        "⏳ Préparation du deck"
+        if selected_language == "FR"
+        else "⏳ Preparing the deck"
+    )
+    for name, fraction in pending.items():
+        label = INDEX_LABELS[selected_language].get(name, name)
+        st.progress(fraction, text=f"{title} : {label}")
+
+
+def display_index_status(deck: Deck, selected_language: str):
+    """Affiche dans la barre latérale l'avancement des index construits en arrière-plan.
+
+    Les modes restent utilisables pendant ce temps (sans recherche ni filtre, et avec une
+    normalisation des réponses à la volée) : la première carte n'attend pas les index.
+    """
+    if precomputer.pending(deck.digest):
+        with st.sidebar:
+            _index_progress(deck.digest, selected_language)
+
+
+HARDEST_CARDS = 20
+
+
+@profiler.timed
+def display_hardest_cards(deck: Deck, selected_language: str):
+    """Affiche les cartes du deck les plus souvent ratées, tous utilisateurs confondus.
+
+    Les statistiques viennent du journal des réponses, dont seule la partie ajoutée depuis le
+    dernier affichage est relue.
+    """
+    if selected_language == "FR":
+        label = "📊 Cartes difficiles"
+        help = "Cartes les plus souvent ratées (taux d'erreur lissé), d'après le journal des réponses."
+        empty = "Aucune réponse enregistrée pour ce deck."
+        columns = [
+            "Français",
+            "Anglais",
+            "Essais",
+            "Erreurs",
+            "Taux d'erreur",
+            "Temps moyen (s)",
+        ]
+    else:
+        label = "📊 Hardest cards"
+        help = "Most often missed cards (smoothed error rate), from the answer log."
+        empty = "No answer recorded for this deck yet."
+        columns = [
+            "French",
+            "English",
+            "Attempts",
+            "Errors",
+            "Error rate",
+            "Mean time (s)",
+        ]
+    if not st.sidebar.toggle(label, help=help, key="hardest_cards"):
+        return None
+    base = deck.base
+    hardest = get_card_stats().hardest(base.digest, HARDEST_CARDS)
+    if hardest.empty:
+        return st.info(empty)
+    rows = hardest.index.to_numpy()
+    table = pd.DataFrame(
+        {
+            columns[0]: [base.french[row] for row in rows],
+            columns[1]: [base.english[row] for row in rows],
+            columns[2]: hardest["attempts"].to_numpy(),
+            columns[3]: hardest["errors"].to_numpy(),
+            columns[4]: hardest["error_rate"].round(2).to_numpy(),
+            columns[5]: hardest["mean_latency"].round(1).to_numpy(),
+        }
+    )
+    st.subheader(label)
+    return st.dataframe(table, hide_index=True)
+
+
+def display_performance_panel(selected_language: str):
+    """Panneau de debug (optionnel) : étapes les plus lentes des derniers reruns et exports."""
+    if selected_language == "FR":
+        label = "🐢 Panneau de performance"
+        caption = "Étapes les plus lentes sur les derniers reruns de la session"
+    else:
+        label = "🐢 Performance panel"
+        caption = "Slowest stages over this session's last reruns"
+    if not st.sidebar.toggle(label, key="performance_panel"):
+        return None
+    registry = deck_registry.stats()
+    metrics = {
+        "deck_cache_hits_total": deck_cache.hits,
+        "deck_cache_misses_total": deck_cache.misses,
+        "deck_registry_decks": registry["decks"],
+        "deck_registry_sessions": registry["sessions"],
+        "deck_registry_bytes": registry["nbytes"],
+    }
+    # les étapes de cette session ; l'export Prometheus couvre tout le processus
+    session = get_script_run_ctx().session_id
+    with st.sidebar.expander(caption, expanded=True):
+        st.dataframe(pd.DataFrame(profiler.summary(session)), hide_index=True)
+        st.json(metrics, expanded=False)
+        col1, col2 = st.columns([1, 1])
+        with col1:
+            st.download_button(
+                "JSON", profiler.to_json(session), "translate_that_profile.json"
+            )
+        with col2:
+            st.download_button(
+                "Prometheus",
+                profiler.to_prometheus(metrics),
+                "translate_that_metrics.txt",
+            )
@@ -0,0 +1,187 @@
+"""
+batch_grading
+=============
+⚙ This module grades a whole classroom submission file against a deck, without the Streamlit UI
+
+Usage : `python -m components.batch_grading deck.xlsx answers.csv results.csv --language FR`
+
+The submission file (CSV or Excel) has one row per answer, with the columns :
+
+- `Student` => the student name or id
+- `Index` => the card index in the deck, as shown in training mode
+- `Answer` => the student's translation
+
+The results file (CSV or Excel, from its extension) holds one row per student with the counts of
+exact, close and wrong answers, the number of cards graded and the /20 mark over those cards.
+`--details` also writes every graded answer.
+
+A card answered several times by the same student is graded once (the last answer counts), and
+cards whose expected translation is empty are not graded.
+"""
+
+import argparse
+import io
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from components.app_components import check_columns, load_data
+from components.deck import Deck
+from components.grading import Grade, grade_batch, mark_20
+
+SUBMISSION_COLUMNS = ["Student", "Index", "Answer"]
+# sens de la traduction, codé comme dans l'app (`select_language`) : colonne du Deck qui
+# contient les réponses attendues
+ANSWER_COLUMNS = {"FR": "english", "GB": "french"}
+# en dessous, lancer des processus coûte plus cher que la notation elle-même
+PARALLEL_THRESHOLD = 20_000
+CHUNK_SIZE = 5_000
+
+
+class DeckFile(io.BytesIO):
+    """Fichier lu depuis le disque, présenté comme un fichier uploadé (`name`, `getvalue`)."""
+
+    def __init__(self, path: Path):
+        super().__init__(path.read_bytes())
+        self.name = path.name
+
+
+def read_table(path: Path) -> pd.DataFrame:
+    """Lit un fichier CSV ou Excel."""
+    if path.suffix.lower() == ".csv":
+        return pd.read_csv(path)
+    return pd.read_excel(path)
+
+
+def write_table(data: pd.DataFrame, path: Path) -> None:
+    """Écrit un fichier CSV ou Excel selon l'extension."""
+    if path.suffix.lower() == ".csv":
+        data.to_csv(path, index=False)
+    else:
+        data.to_excel(path, index=False)
+
+
+def grade_answers(
+    answers: list[str], expected: list[str], jobs: int | None = None
+) -> np.ndarray:
+    """Note toutes les réponses, par blocs répartis sur plusieurs processus si elles sont nombreuses."""
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(answers) < PARALLEL_THRESHOLD:
+        return grade_batch(answers, expected)
+    starts = range(0, len(answers), CHUNK_SIZE)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        grades = executor.map(
+            grade_batch,
+            [answers[i : i + CHUNK_SIZE] for i in starts],
+            [expected[i : i + CHUNK_SIZE] for i in starts],
+        )
+        return np.concatenate(list(grades))
+
+
+def grade_submissions(
+    deck: Deck,
+    submissions: pd.DataFrame,
+    selected_language: str = "FR",
+    jobs: int | None = None,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Note les réponses comme en session d'entraînement et calcule la note /20 de chaque élève.
+
+    Renvoie (détail par réponse, résultats par élève). Seule la dernière réponse d'un élève à une
+    carte est gardée ; une carte sans traduction attendue n'est pas notée. Un indice hors du deck
+    compte comme faux, mais la note /20 porte sur les cartes notées (distinctes et valides).
+    """
+    if selected_language not in ANSWER_COLUMNS:
+        raise ValueError(
+            f"Langue inconnue : {selected_language} (attendu : {', '.join(ANSWER_COLUMNS)})"
+        )
+    missing = [col for col in SUBMISSION_COLUMNS if col not in submissions.columns]
+    if missing:
+        raise ValueError(
+            f"Colonnes manquantes dans les réponses : {', '.join(missing)}"
+        )
+    details = submissions[SUBMISSION_COLUMNS].copy()
+    index = pd.to_numeric(details["Index"], errors="coerce")
+    valid = index.between(0, len(deck) - 1) & (index % 1 == 0)
+    # une carte rendue plusieurs fois n'est notée qu'une fois : la dernière réponse compte
+    repeated = valid & pd.DataFrame(
+        {"Student": details["Student"], "Index": index}
+    ).duplicated(keep="last")
+    details, index, valid = details[~repeated], index[~repeated], valid[~repeated]
+    rows = index.where(valid, 0).astype(np.int64).to_numpy()
+    column = getattr(deck, ANSWER_COLUMNS[selected_language])
+    expected = np.asarray(column, dtype=object)[rows]
+    blank = np.fromiter((not text.strip() for text in expected), bool, len(expected))
+    graded = valid.to_numpy() & ~blank
+    answers = details["Answer"].fillna("").astype(str).to_numpy(dtype=object)
+
+    grades = np.full(len(details), None, dtype=object)
+    grades[~valid.to_numpy()] = Grade.WRONG.value
+    grades[graded] = grade_answers(
+        answers[graded].tolist(), expected[graded].tolist(), jobs
+    )
+    details["Expected"] = np.where(valid, expected, None)
+    details["Grade"] = grades
+
+    counts = pd.crosstab(details["Student"], details["Grade"]).reindex(
+        columns=[grade.value for grade in Grade], fill_value=0
+    )
+    cards = (
+        pd.Series(graded, index=details.index)
+        .groupby(details["Student"])
+        .sum()
+        .reindex(counts.index, fill_value=0)
+    )
+    results = counts.rename(columns=str.capitalize).reset_index()
+    results["Cards"] = cards.to_numpy()
+    results["Score"] = (
+        counts[Grade.EXACT.value].to_numpy() + counts[Grade.CLOSE.value].to_numpy()
+    )
+    results["Mark"] = [
+        mark_20(score, total)
+        for score, total in zip(results["Score"], results["Cards"])
+    ]
+    return details, results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("deck", type=Path)
+    parser.add_argument("submissions", type=Path)
+    parser.add_argument("results", type=Path)
+    parser.add_argument(
+        "--language",
+        choices=list(ANSWER_COLUMNS),
+        default="FR",
+        help="FR : texte français, réponses en anglais. GB : l'inverse (comme dans l'app).",
+    )
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--details", type=Path, default=None)
+    args = parser.parse_args()
+
+    # coupe les avertissements du mode "bare" de Streamlit (appels hors `streamlit run`)
+    logging.disable(logging.WARNING)
+    data = load_data(DeckFile(args.deck))
+    if not check_columns(data):
+        sys.exit(f"{args.deck} : les colonnes French et English sont introuvables.")
+    submissions = read_table(args.submissions)
+    details, results = grade_submissions(
+        Deck.from_dataframe(data), submissions, args.language, args.jobs
+    )
+    write_table(results, args.results)
+    if args.details is not None:
+        write_table(details, args.details)
+    ignored = len(submissions) - len(details)
+    print(
+        f"{len(results)} élèves, {len(details)} réponses -> {args.results} "
+        f"(moyenne {results['Mark'].mean():.2f}/20"
+        + (f", {ignored} réponses en double ignorées)" if ignored else ")")
+    )
+
+
+if __name__ == "__main__":
+    main()
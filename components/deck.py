@@ -0,0 +1,347 @@
+"""
+deck
+====
+⚙ This module holds the compact `Deck` structure used by the random text and training modes
+"""
+
+import hashlib
+import sys
+import threading
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from components.grading import build_accepted_index, split_alternatives
+from components.normalize import normalize, normalize_series
+from components.search import NeighbourIndex, TrigramIndex, WordIndex
+
+# lignes normalisées d'un coup : l'avancement de la normalisation est suivi bloc par bloc
+NORMALIZE_CHUNK = 20_000
+
+
+def _intern_column(values: Iterable) -> tuple[str, ...]:
+    """Convertit une colonne en tuple de chaînes internées (les doublons partagent la même chaîne)."""
+    return tuple(
+        sys.intern(
+            value if isinstance(value, str) else "" if pd.isna(value) else str(value)
+        )
+        for value in values
+    )
+
+
+class Deck:
+    """Deck de cartes French/English avec un accès indexé en O(1).
+
+    - `french` => tuple des textes en français
+    - `english` => tuple des textes en anglais
+    - `digest` => empreinte du contenu, qui identifie le deck (ex: pour la progression)
+    - `answer_index` => {cellule brute: traductions acceptées normalisées}, construit une seule fois par deck
+    - `search_index` => index des mots des deux colonnes pour la recherche du mode Apprentissage
+    - `trigram_index` => index des trigrammes des deux colonnes, pour filtrer le deck (`subset`)
+    - `neighbour_index(lang)` => vecteurs de trigrammes des réponses, pour choisir des distracteurs proches
+    - `row_keys` => empreinte de chaque ligne, qui identifie une carte d'une version du deck à l'autre
+    - `normalized` => textes normalisés des deux colonnes, base des index
+    """
+
+    __slots__ = (
+        "french",
+        "english",
+        "digest",
+        "_answer_index",
+        "_search_index",
+        "_trigram_index",
+        "_row_keys",
+        "_normalized",
+        "_neighbour_indexes",
+        "_normalize_lock",
+    )
+
+    def __init__(self, french: Iterable, english: Iterable):
+        self.french = _intern_column(french)
+        self.english = _intern_column(english)
+        if len(self.french) != len(self.english):
+            raise ValueError("Les colonnes French et English n'ont pas la même taille")
+        content = "\x1f".join(self.french) + "\x1e" + "\x1f".join(self.english)
+        self.digest = hashlib.blake2b(
+            content.encode("utf-8"), digest_size=16
+        ).hexdigest()
+        self._answer_index = None
+        self._search_index = None
+        self._trigram_index = None
+        self._row_keys = None
+        self._normalized = None
+        self._neighbour_indexes = {}
+        self._normalize_lock = threading.Lock()
+
+    @classmethod
+    def from_dataframe(cls, data: pd.DataFrame) -> "Deck":
+        """Construit un Deck à partir des colonnes French & English d'un DataFrame."""
+        return cls(data["French"].tolist(), data["English"].tolist())
+
+    def __len__(self) -> int:
+        return len(self.french)
+
+    @property
+    def base(self) -> "Deck":
+        """Deck complet auquel appartiennent les cartes (lui-même)."""
+        return self
+
+    def row(self, index: int) -> int:
+        """Ligne du deck complet correspondant à la carte `index`."""
+        return index
+
+    def cards(self, rows: np.ndarray) -> np.ndarray:
+        """Carte de chaque ligne du deck complet (-1 pour une ligne hors du deck)."""
+        return np.where((rows >= 0) & (rows < len(self)), rows, -1)
+
+    def prompts(self, selected_language: str) -> tuple[str, ...]:
+        """Renvoie la colonne des textes à traduire selon la langue sélectionnée."""
+        return self.french if selected_language == "FR" else self.english
+
+    def answers(self, selected_language: str) -> tuple[str, ...]:
+        """Renvoie la colonne des traductions attendues selon la langue sélectionnée."""
+        return self.english if selected_language == "FR" else self.french
+
+    def card(self, index: int, selected_language: str) -> tuple[str, str]:
+        """Renvoie le couple (texte à traduire, traduction attendue) de la carte `index`."""
+        if selected_language == "FR":
+            return self.french[index], self.english[index]
+        else:
+            return self.english[index], self.french[index]
+
+    @property
+    def row_keys(self) -> np.ndarray:
+        """Empreinte (64 bits) du contenu French/English de chaque ligne."""
+        if self._row_keys is None:
+            self._row_keys = np.fromiter(
+                (
+                    int.from_bytes(
+                        hashlib.blake2b(
+                            f"{fr}\x1f{en}".encode("utf-8"), digest_size=8
+                        ).digest(),
+                        "little",
+                        signed=True,
+                    )
+                    for fr, en in zip(self.french, self.english)
+                ),
+                dtype=np.int64,
+                count=len(self),
+            )
+        return self._row_keys
+
+    @property
+    def normalized(self) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        """Textes normalisés des colonnes French et English (calculés une seule fois)."""
+        if self._normalized is None:
+            return self.build_normalized()
+        return self._normalized
+
+    def build_normalized(
+        self, progress: Callable[[float], object] | None = None
+    ) -> tuple[tuple[str, ...], tuple[str, ...]]:
+        """Normalise les deux colonnes par blocs de `NORMALIZE_CHUNK` lignes, en signalant
+        l'avancement (0 à 1) après chaque bloc.
+
+        Tous les index en dépendent : un appel concurrent attend le premier au lieu de refaire
+        le calcul.
+        """
+        with self._normalize_lock:
+            if self._normalized is None:
+                total, done = max(2 * len(self), 1), 0
+                columns = []
+                for column in (self.french, self.english):
+                    values = []
+                    for start in range(0, len(column), NORMALIZE_CHUNK):
+                        chunk = column[start : start + NORMALIZE_CHUNK]
+                        values += normalize_series(
+                            pd.Series(chunk, dtype=object)
+                        ).tolist()
+                        done += len(chunk)
+                        if progress is not None:
+                            progress(done / total)
+                    columns.append(tuple(values))
+                self._normalized = tuple(columns)
+        return self._normalized
+
+    @property
+    def answer_index(self) -> dict[str, tuple[str, ...]]:
+        """Index des réponses normalisées des deux colonnes (construit au premier accès)."""
+        if self._answer_index is None:
+            french, english = self.normalized
+            self._answer_index = build_accepted_index(
+                self.french + self.english, french + english
+            )
+        return self._answer_index
+
+    @property
+    def search_index(self) -> WordIndex:
+        """Index de recherche par mots des deux colonnes (construit au premier accès)."""
+        if self._search_index is None:
+            self._search_index = WordIndex(self.normalized)
+        return self._search_index
+
+    @property
+    def trigram_index(self) -> TrigramIndex:
+        """Index des trigrammes des deux colonnes (construit au premier accès)."""
+        if self._trigram_index is None:
+            self._trigram_index = TrigramIndex(self.normalized)
+        return self._trigram_index
+
+    def neighbour_index(self, selected_language: str) -> NeighbourIndex:
+        """Index des textes proches de la colonne des réponses (construit au premier accès)."""
+        column = 1 if selected_language == "FR" else 0
+        if column not in self._neighbour_indexes:
+            self._neighbour_indexes[column] = NeighbourIndex(self.normalized[column])
+        return self._neighbour_indexes[column]
+
+    def neighbours_ready(self, selected_language: str) -> bool:
+        """Indique si l'index des textes proches des réponses est déjà construit."""
+        return (1 if selected_language == "FR" else 0) in self._neighbour_indexes
+
+    def ready(self, index: str) -> bool:
+        """Indique si l'index `index` ("answer_index", "search_index", ...) est déjà construit."""
+        return getattr(self, "_" + index) is not None
+
+    def accepted_answers(self, text: str) -> tuple[str, ...]:
+        """Renvoie les traductions acceptées (normalisées) d'une cellule.
+
+        En O(1) une fois l'index construit (en arrière-plan) ; d'ici là, seule la cellule est normalisée.
+        """
+        accepted = self._answer_index.get(text) if self._answer_index else None
+        if accepted is None:
+            accepted = tuple(normalize(alt) for alt in split_alternatives(text))
+        return accepted
+
+    def inherit(self, previous: "Deck", diff: "DeckDiff | None" = None) -> "DeckDiff":
+        """Reprend ce qui a déjà été calculé pour une version précédente du deck.
+
+        Seules les lignes ajoutées ou modifiées sont normalisées, et seules leurs cellules
+        entrent dans un nouvel index des réponses : le reste est repris tel quel.
+        """
+        diff = diff_decks(previous, self) if diff is None else diff
+        if self._normalized is None and previous._normalized is not None:
+            kept = np.flatnonzero(diff.mapping >= 0)
+            columns = []
+            for old, new in zip(previous._normalized, (self.french, self.english)):
+                values = np.empty(len(self), dtype=object)
+                values[diff.mapping[kept]] = np.asarray(old, dtype=object)[kept]
+                values[diff.added] = normalize_series(
+                    pd.Series([new[row] for row in diff.added.tolist()], dtype=object)
+                ).to_numpy()
+                columns.append(tuple(values.tolist()))
+            self._normalized = tuple(columns)
+        if self._answer_index is None and previous._answer_index is not None:
+            known = previous._answer_index
+            cells = set(self.french) | set(self.english)
+            self._answer_index = {cell: known[cell] for cell in cells if cell in known}
+            self._answer_index.update(
+                build_accepted_index(cell for cell in cells if cell not in known)
+            )
+        return diff
+
+    def subset(self, query: str) -> "DeckView":
+        """Renvoie la vue des cartes qui contiennent `query` (ou, à défaut, qui en sont proches)."""
+        return DeckView(self, self.trigram_index.search(query), query)
+
+
+class DeckDiff:
+    """Correspondance entre deux versions d'un deck, par identité des cartes (`row_keys`).
+
+    - `mapping` => pour chaque ligne de l'ancienne version, sa ligne dans la nouvelle (-1 si retirée)
+    - `added` => lignes de la nouvelle version sans équivalent dans l'ancienne (ajoutées ou modifiées)
+    - `positions` => position d'entraînement équivalente : une carte conservée garde sa nouvelle
+      ligne, une carte retirée renvoie à celle de la prochaine carte conservée de l'ancienne
+      version (-1 si aucune carte conservée ne la suit)
+    - `overlap` => part des cartes de l'ancienne version encore présentes dans la nouvelle
+
+    >>> DeckDiff(np.array([1, 2, 3, 0]), 4).positions.tolist()
+    [1, 2, 3, 0]
+    >>> DeckDiff(np.array([-1, 2, 3, 4, 5, 0]), 6).positions.tolist()
+    [2, 2, 3, 4, 5, 0]
+    >>> DeckDiff(np.array([3, -1, -1, 0, -1]), 4).positions.tolist()
+    [3, 0, 0, 0, -1]
+    """
+
+    __slots__ = ("mapping", "added", "positions")
+
+    def __init__(self, mapping: np.ndarray, size: int):
+        self.mapping = mapping
+        matched = np.zeros(size, dtype=bool)
+        matched[mapping[mapping >= 0]] = True
+        self.added = np.flatnonzero(~matched)
+        # remplissage arrière : la prochaine ligne conservée de l'ancienne version (pas la plus
+        # petite nouvelle ligne qui suit, qui n'a plus de sens dès que des cartes sont déplacées)
+        count = len(mapping)
+        following = np.where(mapping >= 0, np.arange(count), count)
+        following = np.minimum.accumulate(following[::-1])[::-1]
+        self.positions = np.where(
+            following < count, mapping[np.minimum(following, count - 1)], -1
+        )
+
+    def __len__(self) -> int:
+        return len(self.mapping)
+
+    @property
+    def overlap(self) -> float:
+        if not len(self.mapping):
+            return 0.0
+        return float(np.count_nonzero(self.mapping >= 0)) / len(self.mapping)
+
+
+def diff_decks(old: Deck, new: Deck) -> DeckDiff:
+    """Apparie les cartes de deux versions d'un deck (les doublons sont appariés dans l'ordre)."""
+    old_rows = pd.DataFrame({"key": old.row_keys})
+    new_rows = pd.DataFrame({"key": new.row_keys})
+    old_rows["nth"] = old_rows.groupby("key").cumcount()
+    new_rows["nth"] = new_rows.groupby("key").cumcount()
+    old_rows["old"] = np.arange(len(old))
+    new_rows["new"] = np.arange(len(new))
+    pairs = old_rows.merge(new_rows, on=["key", "nth"])
+    mapping = np.full(len(old), -1, dtype=np.int64)
+    mapping[pairs["old"].to_numpy()] = pairs["new"].to_numpy()
+    return DeckDiff(mapping, len(new))
+
+
+class DeckView:
+    """Sous-ensemble d'un Deck défini par ses numéros de lignes, sans copie des textes.
+
+    Expose la même interface que `Deck` pour les modes texte aléatoire et entraînement :
+    la carte `index` de la vue est la ligne `rows[index]` du deck complet.
+    """
+
+    __slots__ = ("deck", "rows", "query", "digest")
+
+    def __init__(self, deck: Deck, rows: np.ndarray, query: str):
+        self.deck = deck
+        self.rows = rows
+        self.query = query
+        # la progression d'entraînement est propre à chaque filtre
+        self.digest = hashlib.blake2b(
+            f"{deck.digest}\x1f{query}".encode("utf-8"), digest_size=16
+        ).hexdigest()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def base(self) -> Deck:
+        return self.deck
+
+    def row(self, index: int) -> int:
+        return int(self.rows[index])
+
+    def cards(self, rows: np.ndarray) -> np.ndarray:
+        """Carte de la vue de chaque ligne du deck complet (-1 pour une ligne hors de la vue)."""
+        if not len(self.rows):
+            return np.full(len(rows), -1)
+        # les lignes d'une recherche approchée sont classées par ressemblance, pas par numéro
+        order = np.argsort(self.rows, kind="stable")
+        found = np.minimum(np.searchsorted(self.rows[order], rows), len(order) - 1)
+        return np.where(self.rows[order[found]] == rows, order[found], -1)
+
+    def card(self, index: int, selected_language: str) -> tuple[str, str]:
+        return self.deck.card(self.row(index), selected_language)
+
+    def accepted_answers(self, text: str) -> tuple[str, ...]:
+        return self.deck.accepted_answers(text)
@@ -0,0 +1,91 @@
+"""
+deck_cache
+==========
+⚙ This module holds the process-wide cache of parsed decks, keyed by the hash of the uploaded bytes
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import pandas as pd
+
+DECK_CACHE_SIZE = int(os.environ.get("TRANSLATE_THAT_DECK_CACHE_SIZE", 8))
+
+
+def hash_bytes(content: bytes) -> str:
+    """Calcule l'empreinte d'un contenu uploadé."""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class DeckCache:
+    """Cache LRU borné des decks déjà parsés.
+
+    - `maxsize` => nombre maximal de decks conservés en mémoire
+    - `hits` / `misses` => compteurs de succès et d'échecs du cache
+    """
+
+    def __init__(self, maxsize: int = DECK_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], pd.DataFrame] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple[str, str]) -> pd.DataFrame | None:
+        """Renvoie le deck associé à la clé, ou None s'il n'est pas en cache."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: tuple[str, str], data: pd.DataFrame) -> None:
+        """Ajoute un deck au cache en évinçant le moins récemment utilisé si besoin."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_load(
+        self, content: bytes, suffix: str, loader: Callable[[str], pd.DataFrame]
+    ) -> pd.DataFrame:
+        """Renvoie le deck en cache ou le charge avec `loader(digest)` s'il est absent."""
+        digest = hash_bytes(content)
+        key = (digest, suffix)
+        data = self.get(key)
+        if data is None:
+            data = loader(digest)
+            if data is not None:
+                self.put(key, data)
+        return data
+
+    def clear(self) -> None:
+        """Vide le cache et remet les compteurs à zéro."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        """Renvoie les statistiques du cache."""
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+deck_cache = DeckCache()
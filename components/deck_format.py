@@ -0,0 +1,171 @@
+"""
+deck_format
+===========
+⚙ This module holds the compiled binary deck format, opened through `mmap` instead of re-parsing spreadsheets
+
+Layout (little-endian) :
+
+- magic `TTDECK1\\0`, `uint32` number of columns, `uint64` number of rows
+- for each column : `uint16` name length + UTF-8 name
+- for each column : `uint8[n]` null flags, `uint64[n + 1]` offsets, UTF-8 blob
+"""
+
+import io
+import mmap
+import os
+import struct
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+MAGIC = b"TTDECK1\0"
+DECK_DIR = Path(os.environ.get("TRANSLATE_THAT_DECK_DIR", ".decks"))
+# même type que les colonnes texte d'un fichier parsé (`str` de pandas, stocké en Arrow)
+STRING_DTYPE = pd.StringDtype("pyarrow", na_value=np.nan)
+
+
+def compiled_path(digest: str) -> Path:
+    """Renvoie le chemin du deck compilé associé à l'empreinte d'un upload."""
+    return DECK_DIR / f"{digest}.deck"
+
+
+def compile_deck(data: pd.DataFrame, path: Path) -> Path:
+    """Compile un DataFrame en deck binaire (écriture atomique via un fichier temporaire)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    columns = [str(col) for col in data.columns]
+    # un fichier temporaire par thread : deux sessions peuvent compiler le même deck en même temps
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<IQ", len(columns), len(data)))
+        for name in columns:
+            encoded = name.encode("utf-8")
+            f.write(struct.pack("<H", len(encoded)))
+            f.write(encoded)
+        for col in data.columns:
+            values = data[col].tolist()
+            nulls = np.fromiter(
+                (pd.isna(v) for v in values), dtype=np.uint8, count=len(values)
+            )
+            chunks = [
+                b"" if null else str(v).encode("utf-8")
+                for v, null in zip(values, nulls)
+            ]
+            offsets = np.zeros(len(chunks) + 1, dtype="<u8")
+            np.cumsum([len(c) for c in chunks], out=offsets[1:])
+            f.write(nulls.tobytes())
+            f.write(offsets.tobytes())
+            f.write(b"".join(chunks))
+    os.replace(tmp_path, path)
+    return path
+
+
+class CompiledDeck:
+    """Deck compilé ouvert en `mmap` : les pages sont partagées entre sessions et processus.
+
+    - `columns` => noms des colonnes
+    - `get(i, column)` => accès O(1) à une cellule, décodée à la demande
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[: len(MAGIC)] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{self.path} n'est pas un deck compilé")
+        pos = len(MAGIC)
+        n_columns, self.n_rows = struct.unpack_from("<IQ", self._mm, pos)
+        pos += struct.calcsize("<IQ")
+        self.columns = []
+        for _ in range(n_columns):
+            (length,) = struct.unpack_from("<H", self._mm, pos)
+            pos += 2
+            self.columns.append(self._mm[pos : pos + length].decode("utf-8"))
+            pos += length
+        self._nulls, self._offsets, self._blob_start = {}, {}, {}
+        for name in self.columns:
+            self._nulls[name] = np.frombuffer(self._mm, np.uint8, self.n_rows, pos)
+            pos += self.n_rows
+            offsets = np.frombuffer(self._mm, "<u8", self.n_rows + 1, pos)
+            self._offsets[name] = offsets
+            pos += offsets.nbytes
+            self._blob_start[name] = pos
+            pos += int(offsets[-1])
+
+    def __len__(self) -> int:
+        return self.n_rows
+
+    def get(self, i: int, column: str) -> str | None:
+        """Renvoie la cellule `i` de la colonne, ou None si elle est vide."""
+        if self._nulls[column][i]:
+            return None
+        offsets, start = self._offsets[column], self._blob_start[column]
+        return self._mm[start + int(offsets[i]) : start + int(offsets[i + 1])].decode(
+            "utf-8"
+        )
+
+    def array(self, column: str) -> pa.LargeStringArray:
+        """Renvoie la colonne en tableau Arrow construit sur le `mmap`, sans copie ni décodage.
+
+        Seuls les offsets (8 octets par ligne) et les cellules vides (1 bit par ligne) sont copiés :
+        les textes restent dans les pages du fichier, partagées entre sessions et processus.
+        """
+        nulls = self._nulls[column]
+        offsets = np.array(self._offsets[column], dtype=np.int64)
+        start = self._blob_start[column]
+        blob = memoryview(self._mm)[start : start + int(offsets[-1])]
+        validity = (
+            pa.py_buffer(np.packbits(nulls == 0, bitorder="little"))
+            if nulls.any()
+            else None
+        )
+        return pa.LargeStringArray.from_buffers(
+            self.n_rows, pa.py_buffer(offsets), pa.py_buffer(blob), validity
+        )
+
+    def column(self, column: str) -> list:
+        """Décode une colonne entière."""
+        return self.array(column).to_pylist()
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Renvoie le DataFrame du deck, dont les colonnes restent adossées au `mmap`."""
+        return pd.DataFrame(
+            {
+                name: pd.arrays.ArrowStringArray(self.array(name), dtype=STRING_DTYPE)
+                for name in self.columns
+            },
+            copy=False,
+        )
+
+    def close(self) -> None:
+        """Ferme le `mmap`, sauf si des colonnes (`array`, `to_dataframe`) l'utilisent encore.
+
+        Dans ce cas, il est fermé quand le dernier tableau qui le référence est libéré.
+        """
+        try:
+            self._mm.close()
+        except BufferError:
+            return
+        self._nulls = self._offsets = {}
+
+
+def open_deck(path: Path) -> CompiledDeck:
+    """Ouvre un deck compilé."""
+    return CompiledDeck(path)
+
+
+if __name__ == "__main__":
+    # python -m components.deck_format <deck.csv|deck.xlsx> <output.deck>
+    from components.ingest import load_deck
+
+    source, target = sys.argv[1], sys.argv[2]
+    with open(source, "rb") as f:
+        buffer = io.BytesIO(f.read())
+    compile_deck(load_deck(buffer, source.rsplit(".", 1)[-1].lower()), Path(target))
+    print(f"{source} -> {target}")
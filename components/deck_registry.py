@@ -0,0 +1,121 @@
+"""
+deck_registry
+=============
+⚙ This module holds the process-wide, reference-counted registry of decks shared by all Streamlit sessions
+"""
+
+import sys
+import threading
+import weakref
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from components.deck import Deck
+from components.precompute import precomputer
+
+
+@dataclass
+class DeckEntry:
+    """Deck partagé : une seule copie immuable par contenu, quel que soit le nombre de sessions."""
+
+    digest: str
+    data: pd.DataFrame
+    deck: Deck
+    sessions: set[str] = field(default_factory=set)
+    # estimée à la demande (`stats`) : parcourir toutes les chaînes ralentirait le chargement
+    nbytes: int | None = None
+
+
+class DeckLease:
+    """Référence d'une session sur un deck partagé, libérée explicitement ou à la fin de la session."""
+
+    __slots__ = ("digest", "session_id", "deck", "data", "_finalizer", "__weakref__")
+
+    def __init__(self, registry: "DeckRegistry", entry: DeckEntry, session_id: str):
+        self.digest = entry.digest
+        self.session_id = session_id
+        self.deck = entry.deck
+        self.data = entry.data
+        self._finalizer = weakref.finalize(
+            self, registry._release, entry.digest, session_id
+        )
+
+    def release(self) -> None:
+        self._finalizer()
+
+
+def _deck_nbytes(data: pd.DataFrame, deck: Deck) -> int:
+    """Estime la mémoire occupée par le DataFrame et les chaînes du Deck."""
+    strings = {id(text): text for text in deck.french + deck.english}
+    return int(data.memory_usage(deep=True).sum()) + sum(
+        sys.getsizeof(text) for text in strings.values()
+    )
+
+
+class DeckRegistry:
+    """Registre des decks en cours d'utilisation, indexé par empreinte du contenu."""
+
+    def __init__(self):
+        self._entries: dict[str, DeckEntry] = {}
+        # réentrant : un bail peut être libéré par le ramasse-miettes pendant un `acquire`
+        self._lock = threading.RLock()
+
+    def acquire(self, digest: str, data: pd.DataFrame, session_id: str) -> DeckLease:
+        """Renvoie le deck partagé de ce contenu (construit une seule fois) pour une session."""
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                entry.sessions.add(session_id)
+                return DeckLease(self, entry, session_id)
+        # construction hors verrou : les autres decks restent accessibles entre-temps
+        deck = Deck.from_dataframe(data)
+        built = DeckEntry(digest, data, deck)
+        with self._lock:
+            entry = self._entries.setdefault(digest, built)
+            entry.sessions.add(session_id)
+            return DeckLease(self, entry, session_id)
+
+    def find_deck(self, deck_digest: str) -> Deck | None:
+        """Renvoie le deck partagé dont le contenu a cette empreinte (`Deck.digest`), s'il est chargé."""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.deck.digest == deck_digest:
+                    return entry.deck
+        return None
+
+    def _release(self, digest: str, session_id: str) -> None:
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return
+            entry.sessions.discard(session_id)
+            if not entry.sessions:
+                del self._entries[digest]
+                # un même contenu peut venir de deux fichiers (ex: CSV et Excel)
+                if not any(e.deck is entry.deck for e in self._entries.values()):
+                    precomputer.forget(entry.deck.digest)
+
+    def stats(self) -> dict:
+        """Métriques : nombre de decks, de sessions et mémoire occupée."""
+        with self._lock:
+            entries = list(self._entries.values())
+            for entry in entries:
+                if entry.nbytes is None:
+                    entry.nbytes = _deck_nbytes(entry.data, entry.deck)
+            return {
+                "decks": len(entries),
+                "sessions": len(set().union(*(e.sessions for e in entries))),
+                "nbytes": sum(e.nbytes for e in entries),
+                "per_deck": {
+                    e.digest: {
+                        "sessions": len(e.sessions),
+                        "nbytes": e.nbytes,
+                        "rows": len(e.deck),
+                    }
+                    for e in entries
+                },
+            }
+
+
+deck_registry = DeckRegistry()
@@ -0,0 +1,210 @@
+"""
+events
+======
+⚙ This module holds the append-only answer event log (buffered JSONL) and the incremental per-card difficulty statistics
+"""
+
+import atexit
+import io
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+EVENT_LOG = os.environ.get("TRANSLATE_THAT_EVENT_LOG", ".answers.jsonl")
+BATCH_SIZE = 256
+READ_SIZE = 64 * 1024 * 1024
+# colonnes d'un événement : une réponse soumise dans un des modes de l'app
+EVENT_FIELDS = ("t", "user", "deck", "card", "mode", "answer", "correct", "latency")
+
+logger = logging.getLogger(__name__)
+
+
+class EventLog:
+    """Journal des réponses, en ajout seul : une ligne JSON compacte par réponse.
+
+    Enregistrer une réponse ne fait qu'ajouter un élément à la file : le thread d'écriture
+    regroupe les événements en attente et les ajoute au fichier en une seule écriture.
+    """
+
+    def __init__(self, path: str = EVENT_LOG):
+        self.path = path
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="event-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _write_loop(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            lines = "".join(line for line in batch if isinstance(line, str))
+            try:
+                if lines:
+                    with open(self.path, "a", encoding="utf-8") as file:
+                        file.write(lines)
+            except OSError:
+                # le lot est perdu, mais le thread d'écriture continue avec les suivants
+                logger.exception("Écriture du journal des réponses impossible")
+            finally:
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+                    self._queue.task_done()
+
+    def record(
+        self,
+        user: str,
+        deck: str,
+        card: int,
+        mode: str,
+        answer: str,
+        correct: bool,
+        latency: float,
+    ) -> None:
+        """Ajoute (en différé) une réponse au journal."""
+        event = (
+            round(time.time(), 3),
+            user,
+            deck,
+            card,
+            mode,
+            answer,
+            int(correct),
+            round(latency, 3),
+        )
+        line = json.dumps(
+            dict(zip(EVENT_FIELDS, event)), ensure_ascii=False, separators=(",", ":")
+        )
+        self._queue.put(line + "\n")
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Attend que tous les événements en attente soient traités.
+
+        Renvoie False s'ils ne le sont pas tous au bout de `timeout` secondes.
+        """
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+
+class CardStats:
+    """Taux d'erreur de chaque carte, agrégés à partir du journal des réponses.
+
+    Seule la fin du journal ajoutée depuis la dernière lecture est relue : elle est agrégée par
+    (deck, carte) avec pandas, puis ajoutée aux totaux déjà calculés. Un journal de plusieurs
+    millions de réponses n'est donc lu en entier qu'une fois par processus.
+    """
+
+    def __init__(self, path: str = EVENT_LOG):
+        self.path = path
+        self._offset = 0
+        self._totals = self._empty()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _empty() -> pd.DataFrame:
+        index = pd.MultiIndex.from_arrays([[], []], names=["deck", "card"])
+        return pd.DataFrame(
+            {"attempts": [], "errors": [], "latency": []}, index=index, dtype=np.int64
+        ).astype({"latency": np.float64})
+
+    def refresh(self) -> None:
+        """Ajoute aux totaux les événements écrits depuis le dernier appel."""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                return
+            if size < self._offset:
+                # journal supprimé ou remplacé : tout est recalculé
+                self._offset, self._totals = 0, self._empty()
+            if size == self._offset:
+                return
+            with open(self.path, "rb") as file:
+                file.seek(self._offset)
+                # par blocs : un long journal n'est jamais chargé en entier en mémoire
+                while self._offset < size:
+                    chunk = file.read(min(READ_SIZE, size - self._offset))
+                    # une ligne en cours d'écriture sera lue au prochain appel
+                    end = chunk.rfind(b"\n") + 1
+                    if not end:
+                        return
+                    file.seek(self._offset + end)
+                    self._offset += end
+                    self._add(chunk[:end])
+
+    def _add(self, lines: bytes) -> None:
+        # moteur pyarrow (déclaré dans requirements.txt) : environ 3 fois plus rapide que le
+        # moteur par défaut sur le journal
+        events = pd.read_json(io.BytesIO(lines), lines=True, engine="pyarrow")
+        events = events.assign(errors=1 - events["correct"])
+        grouped = events.groupby(["deck", "card"]).agg(
+            attempts=("correct", "size"),
+            errors=("errors", "sum"),
+            latency=("latency", "sum"),
+        )
+        self._totals = self._totals.add(grouped, fill_value=0).astype(
+            self._totals.dtypes.to_dict()
+        )
+
+    def error_rates(self, deck: str) -> pd.DataFrame:
+        """Renvoie, pour chaque carte répondue du deck, essais, erreurs, taux d'erreur et temps moyen.
+
+        Le taux d'erreur est lissé comme pour le tirage pondéré : `(erreurs + 1) / (essais + 2)`.
+        """
+        self.refresh()
+        with self._lock:
+            totals = self._totals
+        try:
+            cards = totals.xs(deck, level="deck")
+        except KeyError:
+            cards = self._empty().droplevel("deck")
+        return cards.assign(
+            error_rate=(cards["errors"] + 1) / (cards["attempts"] + 2),
+            mean_latency=cards["latency"] / cards["attempts"],
+        )
+
+    def hardest(
+        self, deck: str, count: int = 10, min_attempts: int = 1
+    ) -> pd.DataFrame:
+        """Renvoie les `count` cartes du deck les plus souvent ratées (taux d'erreur lissé)."""
+        rates = self.error_rates(deck)
+        rates = rates[rates["attempts"] >= min_attempts]
+        return rates.sort_values(
+            ["error_rate", "attempts"], ascending=False, kind="stable"
+        ).head(count)
+
+
+_log: EventLog | None = None
+_stats: CardStats | None = None
+_lock = threading.Lock()
+
+
+def get_event_log() -> EventLog:
+    """Renvoie le journal des réponses du processus (créé au premier appel)."""
+    global _log
+    with _lock:
+        if _log is None:
+            _log = EventLog()
+            atexit.register(_log.flush, 5.0)
+        return _log
+
+
+def get_card_stats() -> CardStats:
+    """Renvoie les statistiques par carte du processus (créées au premier appel)."""
+    global _stats
+    with _lock:
+        if _stats is None:
+            _stats = CardStats()
+        return _stats
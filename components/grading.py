@@ -0,0 +1,314 @@
+"""
+grading
+=======
+⚙ This module holds the fuzzy grading engine : bounded edit distance, token alignment and multiple accepted answers
+"""
+
+import os
+from enum import Enum
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from components.normalize import normalize, normalize_series
+
+ALTERNATIVE_SEPARATOR = "|"
+TYPO_RATIO = float(os.environ.get("TRANSLATE_THAT_TYPO_RATIO", 0.2))
+MAX_TYPOS = 3
+DP_GROUP_SIZE = 2_048
+# histogrammes (caractères et bigrammes, hachés) des traductions acceptées, pour écarter sans
+# programmation dynamique celles qui sont forcément trop loin de la réponse
+CHAR_BINS = 64
+BIGRAM_BINS = 256
+
+
+class Grade(Enum):
+    EXACT = "exact"
+    CLOSE = "close"
+    WRONG = "wrong"
+
+
+def mark_20(score: int, total: int) -> float:
+    """Note /20 d'une session : une bonne réponse (exacte ou proche) vaut un point."""
+    return round(score / total * 20, 2) if total else 0.0
+
+
+def typo_budget(text: str, ratio: float = TYPO_RATIO) -> int:
+    """Nombre de fautes de frappe tolérées pour un texte attendu."""
+    return min(int(len(text) * ratio), MAX_TYPOS)
+
+
+def split_alternatives(text: str) -> list[str]:
+    """Découpe une cellule "car | automobile" en traductions acceptées."""
+    return [alt for alt in text.split(ALTERNATIVE_SEPARATOR) if alt.strip()] or [text]
+
+
+def build_accepted_index(
+    answers: Iterable[str], normalized: Iterable[str] | None = None
+) -> dict[str, tuple[str, ...]]:
+    """Construit l'index {cellule brute: traductions acceptées normalisées}.
+
+    Une cellule sans alternative est acceptée telle que normalisée : avec `normalized` (textes
+    déjà normalisés des cellules, ex: `Deck.normalized`), elle n'est pas normalisée à nouveau.
+    Seules les cellules à alternatives sont découpées et normalisées en une passe, puis
+    regroupées par tranches de la liste aplatie.
+    """
+    answers = list(answers)
+    if normalized is None:
+        single = list(
+            dict.fromkeys(c for c in answers if ALTERNATIVE_SEPARATOR not in c)
+        )
+        normalized = normalize_series(pd.Series(single, dtype=object)).tolist()
+        index = dict(zip(single, zip(normalized)))
+    else:
+        # les cellules à alternatives sont remplacées juste après
+        index = dict(zip(answers, zip(normalized)))
+    multi = list(dict.fromkeys(c for c in answers if ALTERNATIVE_SEPARATOR in c))
+    if multi:
+        alternatives = [split_alternatives(cell) for cell in multi]
+        flat = normalize_series(
+            pd.Series([alt for alts in alternatives for alt in alts], dtype=object)
+        ).tolist()
+        ends = np.cumsum([len(alts) for alts in alternatives]).tolist()
+        starts = [0] + ends[:-1]
+        index.update(
+            zip(multi, (tuple(flat[start:end]) for start, end in zip(starts, ends)))
+        )
+    return index
+
+
+def bounded_distance(a: str, b: str, max_distance: int) -> int:
+    """Distance de Damerau-Levenshtein (transpositions adjacentes) bornée.
+
+    Seule la bande diagonale de largeur `max_distance` est calculée et le calcul s'arrête dès
+    que toute la ligne dépasse la borne : le résultat vaut alors `max_distance + 1`.
+    """
+    if a == b:
+        return 0
+    len_a, len_b = len(a), len(b)
+    if abs(len_a - len_b) > max_distance:
+        return max_distance + 1
+    if len_a == 0 or len_b == 0:
+        return max(len_a, len_b)
+    over = max_distance + 1
+    prev_prev = None
+    prev = list(range(len_b + 1))
+    for i in range(1, len_a + 1):
+        current = [over] * (len_b + 1)
+        current[0] = i
+        lo, hi = max(1, i - max_distance), min(len_b, i + max_distance)
+        row_min = current[0] if lo == 1 else over
+        char_a = a[i - 1]
+        for j in range(lo, hi + 1):
+            cost = 0 if char_a == b[j - 1] else 1
+            value = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if (
+                prev_prev is not None
+                and j > 1
+                and char_a == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                value = min(value, prev_prev[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return over
+        prev_prev, prev = prev, current
+    return min(prev[len_b], over)
+
+
+def _profiles(texts: Sequence[str]) -> np.ndarray:
+    """Histogrammes hachés des caractères puis des bigrammes de chaque texte, en une passe."""
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), np.uint32).astype(
+        np.int64
+    )
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    owners = np.repeat(np.arange(len(texts)), lengths)
+    chars = np.bincount(
+        owners * CHAR_BINS + codes % CHAR_BINS, minlength=len(texts) * CHAR_BINS
+    )
+    # les bigrammes à cheval sur deux textes sont écartés
+    inside = owners[1:] == owners[:-1]
+    bigrams = np.bincount(
+        (owners[1:] * BIGRAM_BINS + (codes[:-1] * 31 + codes[1:]) % BIGRAM_BINS)[
+            inside
+        ],
+        minlength=len(texts) * BIGRAM_BINS,
+    )
+    return np.hstack([chars.reshape(len(texts), -1), bigrams.reshape(len(texts), -1)])
+
+
+def distance_lower_bounds(answer: str, accepted: Sequence[str]) -> np.ndarray:
+    """Minorants de la distance entre la réponse et chaque traduction acceptée, en une passe.
+
+    Une opération (insertion, suppression, substitution, transposition) change l'histogramme
+    des caractères d'au plus 2 et celui des bigrammes d'au plus 6 : la distance vaut au moins
+    l'écart des histogrammes divisé d'autant. Regrouper des caractères dans un même casier
+    (hachage) ne peut que réduire l'écart, le minorant reste donc valable.
+    """
+    profiles = _profiles([answer, *accepted])
+    gaps = np.abs(profiles[1:] - profiles[0])
+    return np.maximum(
+        (gaps[:, :CHAR_BINS].sum(axis=1) + 1) // 2,
+        (gaps[:, CHAR_BINS:].sum(axis=1) + 5) // 6,
+    )
+
+
+def _tokens_aligned(answer: str, expected: str) -> bool:
+    """Vérifie mot à mot qu'aucun mot n'a été remplacé par un autre (ex: "cat" au lieu de "car")."""
+    answer_tokens, expected_tokens = answer.split(), expected.split()
+    if len(answer_tokens) != len(expected_tokens):
+        return True
+    return all(
+        bounded_distance(got, want, typo_budget(want, 0.25)) <= typo_budget(want, 0.25)
+        for got, want in zip(answer_tokens, expected_tokens)
+    )
+
+
+def grade(answer: str, accepted: Sequence[str]) -> Grade:
+    """Note une réponse déjà normalisée contre les traductions acceptées normalisées.
+
+    Seules les traductions dont l'écart de longueur et le minorant (`distance_lower_bounds`)
+    restent dans le budget de fautes passent par la distance d'édition.
+    """
+    if answer in accepted:
+        return Grade.EXACT
+    bounds = None
+    for position, expected in enumerate(accepted):
+        budget = typo_budget(expected)
+        if not budget or abs(len(answer) - len(expected)) > budget:
+            continue
+        if bounds is None:
+            bounds = distance_lower_bounds(answer, accepted)
+        if bounds[position] > budget:
+            continue
+        if bounded_distance(answer, expected, budget) <= budget:
+            if _tokens_aligned(answer, expected):
+                return Grade.CLOSE
+    return Grade.WRONG
+
+
+def grade_text(answer: str, expected: str) -> Grade:
+    """Note une réponse brute contre une cellule brute (pratique hors d'un deck)."""
+    accepted = tuple(normalize(alt) for alt in split_alternatives(expected))
+    return grade(normalize(answer), accepted)
+
+
+def _encode(texts: Sequence[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Encode une liste de textes en matrice de points de code (complétée par -1)."""
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    codes = np.full((len(texts), max(int(lengths.max(initial=0)), 1)), -1, np.int64)
+    for row, text in enumerate(texts):
+        codes[row, : len(text)] = np.frombuffer(text.encode("utf-32-le"), np.uint32)
+    return codes, lengths
+
+
+def batch_distances(
+    answers: Sequence[str], expected: Sequence[str], band: int | None = None
+) -> np.ndarray:
+    """Distances de Damerau-Levenshtein de paires (réponse, attendu), vectorisées sur les paires.
+
+    Avec `band`, seules les cellules à moins de `band` de la diagonale sont calculées : les
+    distances jusqu'à `band` restent exactes, les autres valent au moins `band + 1`.
+    """
+    n = len(answers)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    a, len_a = _encode(answers)
+    b, len_b = _encode(expected)
+    width_a, width_b = a.shape[1], b.shape[1]
+    band = max(width_a, width_b) if band is None else band
+    far = band + 1
+    rows = np.arange(n)
+    prev_prev = None
+    prev = np.broadcast_to(
+        np.minimum(np.arange(width_b + 1), far), (n, width_b + 1)
+    ).copy()
+    result = np.where(len_a == 0, len_b, 0)
+    for i in range(1, width_a + 1):
+        current = np.full_like(prev, far)
+        current[:, 0] = min(i, far)
+        char_a = a[:, i - 1]
+        for j in range(max(1, i - band), min(width_b, i + band) + 1):
+            cost = (char_a != b[:, j - 1]).astype(np.int64)
+            value = np.minimum(
+                np.minimum(prev[:, j] + 1, current[:, j - 1] + 1), prev[:, j - 1] + cost
+            )
+            if prev_prev is not None and j > 1:
+                swap = (char_a == b[:, j - 2]) & (a[:, i - 2] == b[:, j - 1])
+                value = np.where(
+                    swap, np.minimum(value, prev_prev[:, j - 2] + 1), value
+                )
+            current[:, j] = np.minimum(value, far)
+        done = len_a == i
+        result[done] = current[rows[done], len_b[done]]
+        prev_prev, prev = prev, current
+    return result
+
+
+def batch_bounded_distances(
+    answers: np.ndarray,
+    expected: np.ndarray,
+    expected_lengths: np.ndarray,
+    budgets: np.ndarray,
+    group_size: int = DP_GROUP_SIZE,
+) -> np.ndarray:
+    """Distances des paires, exactes jusqu'au budget (au-delà : `budget + 1`).
+
+    Les réponses identiques et les paires dont l'écart de longueur dépasse le budget sont
+    tranchées sans programmation dynamique ; les autres sont triées par longueur puis traitées
+    par groupes, pour que `batch_distances` ne complète pas tout le lot à la plus longue chaîne.
+    """
+    answer_lengths = np.fromiter(map(len, answers), np.int64, len(answers))
+    distances = budgets + 1
+    exact = answers == expected
+    distances[exact] = 0
+    todo = np.flatnonzero(
+        ~exact & (budgets > 0) & (np.abs(answer_lengths - expected_lengths) <= budgets)
+    )
+    todo = todo[np.argsort(expected_lengths[todo], kind="stable")]
+    for start in range(0, len(todo), group_size):
+        group = todo[start : start + group_size]
+        distances[group] = np.minimum(
+            batch_distances(
+                answers[group].tolist(),
+                expected[group].tolist(),
+                band=int(budgets[group].max()),
+            ),
+            budgets[group] + 1,
+        )
+    return distances
+
+
+def grade_batch(answers: Sequence[str], expected: Sequence[str]) -> np.ndarray:
+    """Note en une passe de nombreuses paires (réponse brute, cellule brute).
+
+    Renvoie un tableau de `Grade.value` ("exact", "close", "wrong").
+    """
+    answers = normalize_series(pd.Series(list(answers), dtype=object)).to_numpy()
+    cells = pd.Series(list(expected), dtype=object).map(split_alternatives).explode()
+    pair_ids = cells.index.to_numpy()
+    candidates = normalize_series(cells.reset_index(drop=True)).to_numpy()
+    pair_answers = answers[pair_ids]
+    lengths = np.fromiter(map(len, candidates), np.int64, len(candidates))
+    budgets = np.minimum((lengths * TYPO_RATIO).astype(np.int64), MAX_TYPOS)
+    distances = batch_bounded_distances(pair_answers, candidates, lengths, budgets)
+    aligned = np.fromiter(
+        (
+            _tokens_aligned(got, want) if 0 < d <= budget else True
+            for got, want, d, budget in zip(
+                pair_answers, candidates, distances, budgets
+            )
+        ),
+        dtype=bool,
+        count=len(candidates),
+    )
+    pair_grade = np.where(
+        distances == 0, 0, np.where((distances <= budgets) & aligned, 1, 2)
+    )
+    best = np.full(len(answers), 2, dtype=np.int64)
+    np.minimum.at(best, pair_ids, pair_grade)
+    labels = np.array([Grade.EXACT.value, Grade.CLOSE.value, Grade.WRONG.value])
+    return labels[best]
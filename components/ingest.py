@@ -0,0 +1,105 @@
+"""
+ingest
+======
+⚙ This module holds the streaming, column-pruned ingestion of uploaded CSV/Excel decks
+"""
+
+from typing import Callable, Iterator
+
+import pandas as pd
+from openpyxl import load_workbook
+
+REQUIRED_COLUMNS = ["French", "English"]
+CHUNK_SIZE = 10_000
+
+
+def read_header(file, suffix: str) -> list:
+    """Lit uniquement la ligne d'en-tête du fichier, sans charger le corps."""
+    file.seek(0)
+    if suffix == "csv":
+        header = pd.read_csv(file, nrows=0).columns.tolist()
+    elif suffix == "xlsx":
+        workbook = load_workbook(file, read_only=True)
+        try:
+            first_row = next(
+                workbook.worksheets[0].iter_rows(max_row=1, values_only=True), ()
+            )
+        finally:
+            workbook.close()
+        header = [cell for cell in first_row if cell is not None]
+    else:
+        header = pd.read_excel(file, nrows=0).columns.tolist()
+    file.seek(0)
+    return header
+
+
+def _iter_xlsx_chunks(
+    file, columns: list[str], chunksize: int
+) -> Iterator[tuple[pd.DataFrame, float]]:
+    """Parcourt les lignes d'un xlsx en lecture seule et les regroupe par blocs."""
+    workbook = load_workbook(file, read_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = list(next(rows, ()))
+        positions = [header.index(col) for col in columns]
+        total = max((sheet.max_row or 1) - 1, 1)
+        buffer, done = [], 0
+        for row in rows:
+            values = [row[i] if i < len(row) else None for i in positions]
+            if all(value is None for value in values):
+                continue
+            buffer.append(values)
+            if len(buffer) >= chunksize:
+                done += len(buffer)
+                yield pd.DataFrame(buffer, columns=columns), min(done / total, 1.0)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns), 1.0
+    finally:
+        workbook.close()
+
+
+def iter_chunks(
+    file,
+    suffix: str,
+    columns: list[str] = REQUIRED_COLUMNS,
+    chunksize: int = CHUNK_SIZE,
+) -> Iterator[tuple[pd.DataFrame, float]]:
+    """Lit le corps du fichier par blocs en ne gardant que les colonnes utiles.
+
+    Chaque bloc est renvoyé avec la progression estimée (entre 0 et 1).
+    """
+    file.seek(0)
+    if suffix == "csv":
+        total = max(file.getvalue().count(b"\n") - 1, 1)
+        done = 0
+        for chunk in pd.read_csv(file, usecols=columns, chunksize=chunksize):
+            done += len(chunk)
+            yield chunk[columns], min(done / total, 1.0)
+    elif suffix == "xlsx":
+        yield from _iter_xlsx_chunks(file, columns, chunksize)
+    else:
+        # openpyxl ne lit pas le format .xls : lecture en un seul bloc
+        yield pd.read_excel(file, usecols=columns)[columns], 1.0
+
+
+def load_deck(
+    file, suffix: str, progress: Callable[[float], None] | None = None
+) -> pd.DataFrame:
+    """Charge un deck en streaming, en rejetant le fichier dès l'en-tête si besoin.
+
+    Si les colonnes French & English sont absentes, seul l'en-tête est renvoyé (DataFrame vide)
+    et le corps du fichier n'est jamais lu.
+    """
+    header = read_header(file, suffix)
+    if not all(col in header for col in REQUIRED_COLUMNS):
+        return pd.DataFrame(columns=header)
+    chunks = []
+    for chunk, fraction in iter_chunks(file, suffix):
+        chunks.append(chunk)
+        if progress is not None:
+            progress(fraction)
+    if not chunks:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS)
+    return pd.concat(chunks, ignore_index=True)
@@ -0,0 +1,70 @@
+"""
+normalize
+=========
+⚙ This module holds the answer normalization pipeline, in a scalar and a vectorized flavour
+"""
+
+import os
+import re
+import unicodedata
+
+import pandas as pd
+
+STRIP_ACCENTS = os.environ.get("TRANSLATE_THAT_STRIP_ACCENTS", "1") == "1"
+
+APOSTROPHES = re.compile(r"[’‘`´]")
+CONTRACTIONS = {
+    "won't": "will not",
+    "can't": "can not",
+    "cannot": "can not",
+    "shan't": "shall not",
+    "let's": "let us",
+    "n't": " not",
+    "'re": " are",
+    "'m": " am",
+    "'ve": " have",
+    "'ll": " will",
+    "'d": " would",
+}
+CONTRACTION = re.compile(
+    r"\b(?:won't|can't|cannot|shan't|let's)\b|n't\b|'(?:re|m|ve|ll|d)\b"
+)
+COMBINING_MARKS = re.compile(r"[\u0300-\u036f]")
+SEPARATORS = re.compile(r"[\W_]+")
+LINE_SEPARATORS = re.compile(r"[^\w\n]+")
+
+
+def _expand(match: re.Match) -> str:
+    return CONTRACTIONS[match.group(0)]
+
+
+def normalize(text: str, strip_accents: bool = STRIP_ACCENTS) -> str:
+    """Normalise une réponse : NFKC, casse, contractions, accents, ponctuation et espaces."""
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = CONTRACTION.sub(_expand, APOSTROPHES.sub("'", text))
+    if strip_accents and not text.isascii():
+        text = COMBINING_MARKS.sub("", unicodedata.normalize("NFD", text))
+    return SEPARATORS.sub(" ", text).strip()
+
+
+def normalize_series(
+    values: pd.Series, strip_accents: bool = STRIP_ACCENTS
+) -> pd.Series:
+    """Version vectorisée de `normalize`, appliquée à toute une colonne.
+
+    Les valeurs sont jointes par des retours à la ligne afin que chaque étape soit une seule
+    passe en C sur un gros texte, plutôt qu'un appel Python par ligne.
+    """
+    values = values.astype(str)
+    if values.empty:
+        return values.astype(object)
+    text = "\n".join(values)
+    if text.count("\n") != len(values) - 1:
+        text = "\n".join(value.replace("\n", " ") for value in values)
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = CONTRACTION.sub(_expand, APOSTROPHES.sub("'", text))
+    if strip_accents and not text.isascii():
+        text = COMBINING_MARKS.sub("", unicodedata.normalize("NFD", text))
+    text = LINE_SEPARATORS.sub(" ", text.replace("_", " "))
+    text = text.replace(" \n", "\n").replace("\n ", "\n").strip(" ")
+    return pd.Series(text.split("\n"), index=values.index, dtype=object)
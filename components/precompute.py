@@ -0,0 +1,175 @@
+"""
+precompute
+==========
+⚙ This module holds the background worker pool that builds the expensive structures derived from a deck
+"""
+
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable
+
+from components.deck import Deck, DeckDiff
+
+INDEX_WORKERS = int(os.environ.get("TRANSLATE_THAT_INDEX_WORKERS", 2))
+# index construits pour chaque deck chargé (sur ses textes normalisés), dans l'ordre où ils
+# deviennent utiles
+DECK_INDEXES = ("answer_index", "trigram_index", "search_index")
+
+logger = logging.getLogger(__name__)
+
+
+def _failed(future: Future) -> bool:
+    return future.done() and not future.cancelled() and future.exception() is not None
+
+
+class Precomputer:
+    """Construit les index d'un deck (et les annotations) sur un pool de threads.
+
+    Le rerun ne fait que planifier les tâches : la première carte s'affiche tout de suite, et
+    chaque fonctionnalité utilise son index dès qu'il est prêt (`Deck.ready`).
+    """
+
+    def __init__(self, workers: int = INDEX_WORKERS):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="deck-index"
+        )
+        self._tasks: dict[tuple[str, str], Future] = {}
+        self._progress: dict[tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        # decks qui ne sont plus utilisés, oubliés au prochain accès (`forget`)
+        self._forgotten: queue.SimpleQueue = queue.SimpleQueue()
+
+    def submit(
+        self, digest: str, name: str, task: Callable[[Callable[[float], None]], object]
+    ) -> Future:
+        """Planifie `task(progress)` une seule fois par (deck, nom) tant qu'elle n'est pas finie.
+
+        Une tâche en échec est journalisée et n'est plus replanifiée : les reruns la relanceraient
+        sinon en boucle, et la fonctionnalité qui en dépend reste simplement indisponible.
+        """
+        key = (digest, name)
+        with self._lock:
+            self._prune()
+            future = self._tasks.get(key)
+            if future is not None and (not future.done() or _failed(future)):
+                return future
+            self._progress[key] = 0.0
+
+            def progress(fraction: float) -> None:
+                self._progress[key] = fraction
+
+            def run() -> None:
+                # le résultat n'est pas gardé : il vit dans le deck ou dans son propre cache
+                task(progress)
+
+            future = self._executor.submit(run)
+            self._tasks[key] = future
+
+        def done(future: Future) -> None:
+            with self._lock:
+                # la tâche a pu être oubliée entre-temps (`forget`)
+                if self._tasks.get(key) is future:
+                    self._progress[key] = 1.0
+            if _failed(future):
+                logger.error(
+                    "Échec de la tâche %r du deck %s",
+                    name,
+                    digest,
+                    exc_info=future.exception(),
+                )
+
+        future.add_done_callback(done)
+        return future
+
+    def schedule(self, deck: Deck) -> None:
+        """Planifie la construction des index du deck qui ne sont pas encore prêts."""
+        with self._lock:
+            inheriting = self._tasks.get((deck.digest, "inherit"))
+        if inheriting is not None and not inheriting.done():
+            # les index seront planifiés à la fin de la reprise
+            return
+        self._build(deck)
+
+    def _build(self, deck: Deck) -> None:
+        if not deck.ready("normalized"):
+            # les index sont planifiés une fois les textes normalisés
+
+            def task(progress: Callable[[float], None]) -> None:
+                deck.build_normalized(progress)
+                self._build(deck)
+
+            self.submit(deck.digest, "normalized", task)
+            return
+        for name in DECK_INDEXES:
+            if not deck.ready(name):
+                self.submit(deck.digest, name, lambda _, name=name: getattr(deck, name))
+
+    def forget(self, digest: str) -> None:
+        """Oublie les tâches d'un deck qui n'est plus utilisé par aucune session.
+
+        Appelé par le registre des decks, parfois depuis un finaliseur (ramasse-miettes) : la
+        demande est seulement mise en file (`SimpleQueue.put` est réentrant) et traitée, verrou
+        tenu, au prochain `submit` ou `pending`.
+        """
+        self._forgotten.put(digest)
+
+    def _prune(self) -> None:
+        """Retire les tâches terminées des decks oubliés (verrou tenu)."""
+        while True:
+            try:
+                digest = self._forgotten.get_nowait()
+            except queue.Empty:
+                return
+            for key in [key for key in self._tasks if key[0] == digest]:
+                future = self._tasks[key]
+                if future.done():
+                    del self._tasks[key]
+                    self._progress.pop(key, None)
+                else:
+                    # retirée à son tour une fois finie
+                    future.add_done_callback(
+                        lambda _, digest=digest: self.forget(digest)
+                    )
+
+    def inherit(self, deck: Deck, previous: Deck, diff: DeckDiff) -> None:
+        """Reprend les calculs d'une version précédente du deck, puis construit ses index."""
+
+        def task(_) -> None:
+            deck.inherit(previous, diff)
+            self._build(deck)
+
+        self.submit(deck.digest, "inherit", task)
+
+    def progress(self, digest: str, name: str) -> float:
+        """Avancement (0 à 1) de la tâche `name` du deck."""
+        return self._progress.get((digest, name), 0.0)
+
+    def pending(self, digest: str) -> dict[str, float]:
+        """Tâches en cours du deck : {nom: avancement}."""
+        with self._lock:
+            self._prune()
+            return {
+                name: self._progress.get((key, name), 0.0)
+                for (key, name), future in self._tasks.items()
+                if key == digest and not future.done()
+            }
+
+    def wait(self, digest: str) -> None:
+        """Attend la fin des tâches du deck (scripts et benchmarks)."""
+        while True:
+            with self._lock:
+                futures = [
+                    f
+                    for (key, _), f in self._tasks.items()
+                    if key == digest and not f.done()
+                ]
+            if not futures:
+                return
+            # une tâche terminée peut en planifier d'autres (reprise d'une version précédente)
+            wait(futures)
+
+
+precomputer = Precomputer()
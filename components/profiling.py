@@ -0,0 +1,189 @@
+"""
+profiling
+=========
+⚙ This module holds the per-rerun timing instrumentation of `translate-that`, with JSON and Prometheus text exports
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+import numpy as np
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+HISTORY_SIZE = int(os.environ.get("TRANSLATE_THAT_PROFILE_HISTORY", 50))
+# sessions dont l'historique est gardé (les moins récemment actives sont oubliées)
+SESSION_LIMIT = 64
+
+# Streamlit exécute le script de chaque session dans son propre thread
+_local = threading.local()
+
+
+class RerunProfiler:
+    """Mesure le temps et les allocations de chaque étape, rerun par rerun.
+
+    - `history` => par session, les `HISTORY_SIZE` derniers reruns : {étape: (ms, blocs alloués)}
+    - les allocations sont le solde de blocs mémoire alloués (`sys.getallocatedblocks`), qui est
+      celui de tout le processus : les reruns simultanés d'autres sessions s'y ajoutent
+    """
+
+    def __init__(
+        self, history_size: int = HISTORY_SIZE, session_limit: int = SESSION_LIMIT
+    ):
+        self.history: OrderedDict[str, deque[dict[str, tuple[float, int]]]] = (
+            OrderedDict()
+        )
+        self.history_size = history_size
+        self.session_limit = session_limit
+        self._lock = threading.Lock()
+
+    def begin(self) -> None:
+        """Démarre l'enregistrement d'un rerun dans le thread courant."""
+        ctx = get_script_run_ctx(suppress_warning=True)
+        _local.session = ctx.session_id if ctx is not None else ""
+        _local.stages = {}
+        _local.start = (time.perf_counter(), sys.getallocatedblocks())
+
+    def end(self) -> None:
+        """Termine le rerun courant et l'ajoute à l'historique."""
+        stages = getattr(_local, "stages", None)
+        if stages is None:
+            return
+        start, blocks = _local.start
+        stages["rerun"] = (
+            (time.perf_counter() - start) * 1e3,
+            sys.getallocatedblocks() - blocks,
+        )
+        with self._lock:
+            history = self.history.get(_local.session)
+            if history is None:
+                history = self.history[_local.session] = deque(maxlen=self.history_size)
+                if len(self.history) > self.session_limit:
+                    self.history.popitem(last=False)
+            self.history.move_to_end(_local.session)
+            history.append(stages)
+        del _local.stages
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Chronomètre une étape du rerun courant (les appels répétés sont cumulés)."""
+        start, blocks = time.perf_counter(), sys.getallocatedblocks()
+        try:
+            yield
+        finally:
+            stages = getattr(_local, "stages", None)
+            if stages is not None:
+                elapsed = (time.perf_counter() - start) * 1e3
+                allocated = sys.getallocatedblocks() - blocks
+                previous_ms, previous_blocks = stages.get(name, (0.0, 0))
+                stages[name] = (previous_ms + elapsed, previous_blocks + allocated)
+
+    def timed(self, fn: Callable) -> Callable:
+        """Décorateur : chronomètre chaque appel de `fn` comme une étape à son nom."""
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self.stage(fn.__name__):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    def rerun(self, fn: Callable) -> Callable:
+        """Décorateur du point d'entrée : un appel de `fn` = un rerun enregistré."""
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            self.begin()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.end()
+
+        return wrapper
+
+    def summary(self, session: str | None = None) -> list[dict]:
+        """Statistiques par étape sur l'historique, de la plus lente à la plus rapide.
+
+        Avec `session`, sur les derniers reruns de cette session ; sinon, sur ceux de toutes les
+        sessions du processus.
+        """
+        with self._lock:
+            if session is None:
+                history = [
+                    stages for reruns in self.history.values() for stages in reruns
+                ]
+            else:
+                history = list(self.history.get(session, ()))
+        per_stage: dict[str, list[tuple[float, int]]] = {}
+        for stages in history:
+            for name, values in stages.items():
+                per_stage.setdefault(name, []).append(values)
+        rows = []
+        for name, values in per_stage.items():
+            times = np.array([ms for ms, _ in values])
+            rows.append(
+                {
+                    "stage": name,
+                    "reruns": len(values),
+                    "p50_ms": round(float(np.percentile(times, 50)), 3),
+                    "p99_ms": round(float(np.percentile(times, 99)), 3),
+                    "max_ms": round(float(times.max()), 3),
+                    "sum_ms": round(float(times.sum()), 3),
+                    "mean_blocks": round(float(np.mean([b for _, b in values])), 1),
+                }
+            )
+        return sorted(rows, key=lambda row: row["p99_ms"], reverse=True)
+
+    def to_json(self, session: str | None = None) -> str:
+        """Export JSON du résumé par étape (d'une session, ou de tout le processus)."""
+        return json.dumps(self.summary(session), indent=2)
+
+    def to_prometheus(self, extra: dict[str, float] | None = None) -> str:
+        """Export au format texte Prometheus (quantiles par étape + métriques additionnelles).
+
+        Les étapes sont résumées sur les derniers reruns de toutes les sessions du processus. Les
+        métriques additionnelles en `_total` sont des compteurs, les autres des jauges.
+        """
+        rows = self.summary()
+        lines = [
+            "# HELP translate_that_stage_milliseconds Wall time per rerun stage,"
+            " over the last reruns of every session of the process.",
+            "# TYPE translate_that_stage_milliseconds summary",
+        ]
+        for row in rows:
+            label = f'stage="{row["stage"]}"'
+            lines.append(
+                f'translate_that_stage_milliseconds{{{label},quantile="0.5"}} {row["p50_ms"]}'
+            )
+            lines.append(
+                f'translate_that_stage_milliseconds{{{label},quantile="0.99"}} {row["p99_ms"]}'
+            )
+            lines.append(
+                f"translate_that_stage_milliseconds_sum{{{label}}} {row['sum_ms']}"
+            )
+            lines.append(
+                f"translate_that_stage_milliseconds_count{{{label}}} {row['reruns']}"
+            )
+        lines += [
+            "# HELP translate_that_stage_allocated_blocks Mean balance of allocated memory"
+            " blocks per rerun stage (process-wide).",
+            "# TYPE translate_that_stage_allocated_blocks gauge",
+        ]
+        for row in rows:
+            lines.append(
+                f'translate_that_stage_allocated_blocks{{stage="{row["stage"]}"}} {row["mean_blocks"]}'
+            )
+        for name, value in (extra or {}).items():
+            kind = "counter" if name.endswith("_total") else "gauge"
+            lines.append(f"# TYPE translate_that_{name} {kind}")
+            lines.append(f"translate_that_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+profiler = RerunProfiler()
@@ -0,0 +1,232 @@
+"""
+progress
+========
+⚙ This module holds the persistent per-user progress store (SQLite in WAL mode, with write-behind batching)
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import Sequence
+
+PROGRESS_DB = os.environ.get("TRANSLATE_THAT_PROGRESS_DB", ".progress.sqlite3")
+BATCH_SIZE = 256
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    user TEXT NOT NULL,
+    deck TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (user, deck)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS answers (
+    user TEXT NOT NULL,
+    deck TEXT NOT NULL,
+    card INTEGER NOT NULL,
+    mode TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    answered_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS answers_by_card ON answers (user, deck, card);
+CREATE TABLE IF NOT EXISTS deck_heads (
+    name TEXT NOT NULL,
+    deck TEXT NOT NULL,
+    source TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (name, deck)
+) WITHOUT ROWID;
+"""
+
+UPSERT_PROGRESS = """
+INSERT INTO progress (user, deck, position, score, updated_at) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (user, deck) DO UPDATE SET
+    position = excluded.position, score = excluded.score, updated_at = excluded.updated_at
+"""
+INSERT_ANSWER = "INSERT INTO answers VALUES (?, ?, ?, ?, ?, ?)"
+# une ligne par lignée de versions d'un nom de fichier : deux decks sans rapport peuvent porter
+# le même nom (ex: deux professeurs qui importent chacun un `vocab.xlsx`)
+UPSERT_VERSION = """
+INSERT INTO deck_heads (name, deck, source, updated_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (name, deck) DO UPDATE SET
+    source = excluded.source, updated_at = excluded.updated_at
+"""
+VERSION_LIMIT = 8
+# table temporaire (par connexion) : ancienne ligne -> nouvelle ligne, nouvelle position
+# (-1 : carte retirée, ou position sans équivalent, qui n'est pas reportée)
+CARD_MAP = "CREATE TEMP TABLE IF NOT EXISTS card_map (old INTEGER PRIMARY KEY, new INTEGER, position INTEGER)"
+REMAP_PROGRESS = """
+INSERT OR IGNORE INTO progress (user, deck, position, score, updated_at)
+SELECT p.user, ?, m.position, p.score, p.updated_at
+FROM progress p JOIN card_map m ON m.old = p.position WHERE p.deck = ? AND m.position >= 0
+"""
+REMAP_ANSWERS = """
+INSERT INTO answers (user, deck, card, mode, correct, answered_at)
+SELECT a.user, ?, m.new, a.mode, a.correct, a.answered_at
+FROM answers a JOIN card_map m ON m.old = a.card WHERE a.deck = ? AND m.new >= 0
+AND NOT EXISTS (SELECT 1 FROM answers b WHERE b.user = a.user AND b.deck = ?)
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection
+
+
+class ProgressStore:
+    """Stockage de la progression : les écritures passent par une file vidée par lots.
+
+    Enregistrer une réponse ne fait qu'ajouter un élément à la file : le thread d'écriture
+    regroupe les éléments en attente dans une seule transaction, hors du rerun Streamlit.
+    """
+
+    def __init__(self, path: str = PROGRESS_DB):
+        self.path = path
+        self._reader = _connect(path)
+        self._reader.executescript(SCHEMA)
+        self._read_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="progress-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _write_loop(self) -> None:
+        connection = _connect(self.path)
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with connection:
+                    for statement, params in batch:
+                        if callable(statement):
+                            statement(connection)
+                        elif statement is not None:
+                            connection.execute(statement, params)
+            except Exception:
+                # le lot est annulé, mais le thread d'écriture continue avec les suivants
+                logger.exception(
+                    "Écriture de %d éléments de progression impossible", len(batch)
+                )
+            finally:
+                for statement, params in batch:
+                    if statement is None:
+                        params.set()
+                    self._queue.task_done()
+
+    def save_position(self, user: str, deck: str, position: int, score: int) -> None:
+        """Enregistre (en différé) la position et le score en session d'entraînement."""
+        self._queue.put((UPSERT_PROGRESS, (user, deck, position, score, time.time())))
+
+    def record_answer(
+        self, user: str, deck: str, card: int, mode: str, correct: bool
+    ) -> None:
+        """Enregistre (en différé) une réponse dans l'historique de la carte."""
+        self._queue.put(
+            (INSERT_ANSWER, (user, deck, card, mode, int(correct), time.time()))
+        )
+
+    def load_position(self, user: str, deck: str) -> tuple[int, int] | None:
+        """Reprise rapide : renvoie (position, score) en une seule requête, ou None."""
+        with self._read_lock:
+            return self._reader.execute(
+                "SELECT position, score FROM progress WHERE user = ? AND deck = ?",
+                (user, deck),
+            ).fetchone()
+
+    def card_history(self, user: str, deck: str) -> list[tuple[int, int, int]]:
+        """Renvoie (carte, essais, erreurs) pour chaque carte déjà répondue."""
+        with self._read_lock:
+            return self._reader.execute(
+                "SELECT card, COUNT(*), COUNT(*) - SUM(correct) FROM answers"
+                " WHERE user = ? AND deck = ? GROUP BY card",
+                (user, deck),
+            ).fetchall()
+
+    def deck_versions(self, name: str) -> list[tuple[str, str]]:
+        """Dernières versions connues d'un nom de fichier, une par lignée, de la plus récente à la
+        plus ancienne : [(empreinte du deck, empreinte du fichier)]."""
+        with self._read_lock:
+            return self._reader.execute(
+                "SELECT deck, source FROM deck_heads WHERE name = ?"
+                " ORDER BY updated_at DESC LIMIT ?",
+                (name, VERSION_LIMIT),
+            ).fetchall()
+
+    def set_deck_version(self, name: str, deck: str, source: str) -> None:
+        """Enregistre (en différé) une version d'un fichier de deck, qui commence sa propre lignée."""
+        self._queue.put((UPSERT_VERSION, (name, deck, source, time.time())))
+
+    def remap_deck(
+        self,
+        name: str,
+        old: str,
+        new: str,
+        source: str,
+        mapping: Sequence[int],
+        positions: Sequence[int],
+    ) -> None:
+        """Reporte la progression et l'historique de tous les utilisateurs sur la nouvelle version.
+
+        Les cartes sont appariées par identité (`DeckDiff`) : l'historique d'une carte suit
+        la carte, même si elle a changé de ligne. La migration n'a lieu qu'une fois, même si
+        plusieurs sessions importent la nouvelle version en même temps.
+        """
+
+        def remap(connection: sqlite3.Connection) -> None:
+            head = connection.execute(
+                "SELECT 1 FROM deck_heads WHERE name = ? AND deck = ?", (name, old)
+            ).fetchone()
+            if head is None:
+                # déjà migrée (par une autre session) : l'ancienne version n'est plus la dernière
+                return
+            connection.execute(CARD_MAP)
+            connection.execute("DELETE FROM card_map")
+            connection.executemany(
+                "INSERT INTO card_map VALUES (?, ?, ?)",
+                zip(range(len(mapping)), mapping, positions),
+            )
+            connection.execute(REMAP_PROGRESS, (new, old))
+            connection.execute(REMAP_ANSWERS, (new, old, new))
+            connection.execute(
+                "DELETE FROM deck_heads WHERE name = ? AND deck = ?", (name, old)
+            )
+            connection.execute(UPSERT_VERSION, (name, new, source, time.time()))
+
+        self._queue.put((remap, None))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Attend que toutes les écritures en attente soient traitées.
+
+        Renvoie False si elles ne le sont pas toutes au bout de `timeout` secondes.
+        """
+        done = threading.Event()
+        self._queue.put((None, done))
+        return done.wait(timeout)
+
+
+_store: ProgressStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_progress_store() -> ProgressStore:
+    """Renvoie le stockage de progression du processus (créé au premier appel)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProgressStore()
+            atexit.register(_store.flush, 5.0)
+        return _store
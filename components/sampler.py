@@ -0,0 +1,180 @@
+"""
+sampler
+=======
+⚙ This module holds the random text sampler : no-repeat shuffled permutation and error-weighted alias sampling
+"""
+
+import numpy as np
+
+OVERFLOW_LIMIT = 64
+
+
+def build_alias_table(weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Construit la table d'alias de Vose : tirage pondéré en O(1) après une construction O(n)."""
+    n = len(weights)
+    scaled = weights * (n / weights.sum())
+    prob = np.ones(n, dtype=np.float64)
+    alias = np.arange(n, dtype=np.int64)
+    small = np.flatnonzero(scaled < 1.0).tolist()
+    large = np.flatnonzero(scaled >= 1.0).tolist()
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] = scaled[more] + scaled[less] - 1.0
+        if scaled[more] < 1.0:
+            small.append(more)
+        else:
+            large.append(more)
+    return prob, alias
+
+
+class RandomSampler:
+    """Tirage des cartes du mode texte aléatoire, conservé en session entre les reruns.
+
+    - mode `shuffle` => parcours d'une permutation aléatoire : aucune carte n'est répétée avant
+      d'avoir vu tout le deck
+    - mode `weighted` => tirage proportionnel au taux d'erreur lissé `(erreurs + 1) / (essais + 2)`
+
+    Le tirage pondéré utilise une table d'alias construite sur une enveloppe des poids
+    (`min(1, 2 * poids)`), avec rejet sous l'enveloppe et un petit réservoir de débordement
+    pour les poids qui la dépassent : chaque mise à jour est en O(1) et la table n'est
+    reconstruite (en O(n)) qu'après O(n) mises à jour.
+    """
+
+    __slots__ = (
+        "attempts",
+        "errors",
+        "weighted",
+        "_rng",
+        "_order",
+        "_position",
+        "_last",
+        "_weights",
+        "_envelope",
+        "_prob",
+        "_alias",
+        "_total_envelope",
+        "_accepted_mass",
+        "_overflow",
+    )
+
+    def __init__(self, size: int, weighted: bool = False, seed: int | None = None):
+        self.attempts = np.zeros(size, dtype=np.int32)
+        self.errors = np.zeros(size, dtype=np.int32)
+        self.weighted = weighted
+        self._rng = np.random.default_rng(seed)
+        self._order = self._rng.permutation(size)
+        self._position = 0
+        self._last = -1
+        self._weights = np.full(size, 0.5, dtype=np.float64)
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return len(self._weights)
+
+    def remap(self, mapping: np.ndarray, size: int) -> "RandomSampler":
+        """Reporte les statistiques des cartes conservées sur une nouvelle version du deck."""
+        sampler = RandomSampler(size, self.weighted)
+        kept = np.flatnonzero(mapping >= 0)
+        sampler.attempts[mapping[kept]] = self.attempts[kept]
+        sampler.errors[mapping[kept]] = self.errors[kept]
+        sampler._weights = (sampler.errors + 1) / (sampler.attempts + 2)
+        sampler._rebuild()
+        return sampler
+
+    def restore(
+        self, cards: np.ndarray, attempts: np.ndarray, errors: np.ndarray
+    ) -> None:
+        """Reprend les statistiques enregistrées des cartes déjà répondues (reprise de session)."""
+        self.attempts[cards] = attempts
+        self.errors[cards] = errors
+        self._weights = (self.errors + 1) / (self.attempts + 2)
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Reconstruit la table d'alias sur les poids courants."""
+        self._envelope = np.minimum(1.0, 2.0 * self._weights)
+        self._prob, self._alias = build_alias_table(self._envelope)
+        self._total_envelope = float(self._envelope.sum())
+        self._accepted_mass = self._total_envelope
+        self._overflow = {}
+
+    def _draw_shuffle(self) -> int:
+        """Carte suivante de la permutation.
+
+        Si c'est la carte tirée juste avant (début d'un nouveau tour), elle est échangée avec une
+        carte plus loin dans la permutation, tirée à sa place : aucune carte n'est sautée.
+        """
+        size = len(self._order)
+        if self._position >= size:
+            self._order = self._rng.permutation(size)
+            self._position = 0
+        if self._order[self._position] == self._last and size > 1:
+            if self._position == size - 1:
+                # dernière carte du tour, déjà montrée juste avant (ex: en tirage pondéré) :
+                # elle compte pour ce tour, et le suivant commence
+                self._order = self._rng.permutation(size)
+                self._position = 0
+            if self._order[self._position] == self._last:
+                later = int(self._rng.integers(self._position + 1, size))
+                self._order[[self._position, later]] = self._order[
+                    [later, self._position]
+                ]
+        card = int(self._order[self._position])
+        self._position += 1
+        return card
+
+    def _draw_weighted(self) -> int:
+        overflow_mass = sum(self._overflow.values())
+        while True:
+            u = self._rng.random() * (self._total_envelope + overflow_mass)
+            if u >= self._total_envelope:
+                # réservoir de débordement : quelques cartes dont le poids a augmenté
+                u -= self._total_envelope
+                for card, mass in self._overflow.items():
+                    u -= mass
+                    if u < 0:
+                        return card
+                continue
+            column = int(self._rng.integers(len(self._prob)))
+            if self._rng.random() < self._prob[column]:
+                card = column
+            else:
+                card = int(self._alias[column])
+            kept = min(self._weights[card], self._envelope[card])
+            if self._rng.random() * self._envelope[card] < kept:
+                return card
+
+    def draw(self) -> int:
+        """Tire l'indice de la prochaine carte (jamais deux fois la même d'affilée)."""
+        if self.weighted:
+            card = self._draw_weighted()
+            for _ in range(8):
+                if card != self._last or len(self) == 1:
+                    break
+                card = self._draw_weighted()
+        else:
+            card = self._draw_shuffle()
+        self._last = card
+        return card
+
+    def record(self, card: int, correct: bool) -> None:
+        """Enregistre une réponse et met à jour le poids de la carte en O(1)."""
+        self.attempts[card] += 1
+        if not correct:
+            self.errors[card] += 1
+        old = self._weights[card]
+        new = (self.errors[card] + 1) / (self.attempts[card] + 2)
+        self._weights[card] = new
+        envelope = self._envelope[card]
+        self._accepted_mass += min(new, envelope) - min(old, envelope)
+        if new > envelope:
+            self._overflow[card] = float(new - envelope)
+        else:
+            self._overflow.pop(card, None)
+        if (
+            len(self._overflow) > OVERFLOW_LIMIT
+            or self._accepted_mass < self._total_envelope / 2
+        ):
+            self._rebuild()
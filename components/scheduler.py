@@ -0,0 +1,95 @@
+"""
+scheduler
+=========
+⚙ This module holds the SM-2 spaced-repetition scheduler, with heap-based next-card selection
+"""
+
+import heapq
+import time
+
+import numpy as np
+
+DAY = 86_400.0
+LEARNING_STEP = 60.0
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+
+
+class Scheduler:
+    """Planificateur SM-2 : l'état de chaque carte tient dans des tableaux NumPy compacts.
+
+    - `due` => date (timestamp) à laquelle la carte doit être revue
+    - `ease` => facteur de facilité SM-2
+    - `interval` => intervalle courant en jours
+    - `reps` => nombre de révisions réussies d'affilée
+
+    La prochaine carte est tirée d'un tas (O(log n)) : les entrées périmées sont ignorées au
+    moment du tirage, le deck n'est donc jamais reparcouru.
+    """
+
+    __slots__ = ("due", "ease", "interval", "reps", "_heap")
+
+    def __init__(self, size: int):
+        self.due = np.zeros(size, dtype=np.float64)
+        self.ease = np.full(size, INITIAL_EASE, dtype=np.float32)
+        self.interval = np.zeros(size, dtype=np.float32)
+        self.reps = np.zeros(size, dtype=np.int32)
+        # les nouvelles cartes sont présentées dans l'ordre du deck
+        self._heap = [(0.0, card) for card in range(size)]
+
+    def __len__(self) -> int:
+        return len(self.due)
+
+    def _clean_top(self) -> None:
+        """Retire du sommet du tas les entrées rendues obsolètes par une révision."""
+        heap, due = self._heap, self.due
+        while heap and heap[0][0] != due[heap[0][1]]:
+            heapq.heappop(heap)
+
+    def next_card(self) -> int:
+        """Renvoie la carte la plus en retard (ou la prochaine à venir si aucune n'est due)."""
+        self._clean_top()
+        return self._heap[0][1]
+
+    def review(self, card: int, quality: int, now: float | None = None) -> None:
+        """Met à jour une carte selon la qualité de la réponse (0 à 5) avec l'algorithme SM-2."""
+        now = time.time() if now is None else now
+        if quality < 3:
+            self.reps[card] = 0
+            self.interval[card] = 0.0
+            due = now + LEARNING_STEP
+        else:
+            reps = int(self.reps[card])
+            if reps == 0:
+                interval = 1.0
+            elif reps == 1:
+                interval = 6.0
+            else:
+                interval = float(self.interval[card]) * float(self.ease[card])
+            self.reps[card] = reps + 1
+            self.interval[card] = interval
+            due = now + interval * DAY
+        ease = self.ease[card] + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        self.ease[card] = max(MIN_EASE, ease)
+        self.due[card] = due
+        heapq.heappush(self._heap, (float(self.due[card]), card))
+        if len(self._heap) > 2 * len(self.due) + 16:
+            self._compact()
+
+    def remap(self, mapping: np.ndarray, size: int) -> "Scheduler":
+        """Reporte l'état des cartes conservées sur une nouvelle version du deck (`DeckDiff.mapping`).
+
+        Les cartes ajoutées ou modifiées repartent de zéro.
+        """
+        scheduler = Scheduler(size)
+        kept = np.flatnonzero(mapping >= 0)
+        target = mapping[kept]
+        for name in ("due", "ease", "interval", "reps"):
+            getattr(scheduler, name)[target] = getattr(self, name)[kept]
+        scheduler._compact()
+        return scheduler
+
+    def _compact(self) -> None:
+        """Reconstruit le tas sans les entrées périmées (coût amorti sur les révisions)."""
+        self._heap = [(float(due), card) for card, due in enumerate(self.due)]
+        heapq.heapify(self._heap)
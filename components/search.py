@@ -0,0 +1,257 @@
+"""
+search
+======
+⚙ This module holds the word, trigram and neighbour indexes used to search a deck without scanning it on every keystroke
+"""
+
+import os
+from bisect import bisect_left
+from functools import reduce
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+from components.grading import typo_budget
+from components.normalize import normalize
+
+# borne chaque colonne d'une ligne : aucun trigramme d'une requête normalisée ne la contient
+SEPARATOR = "\x1f"
+# taille des vecteurs de trigrammes hachés de `NeighbourIndex` (4 octets par valeur et par ligne)
+NEIGHBOUR_DIMENSIONS = int(os.environ.get("TRANSLATE_THAT_NEIGHBOUR_DIMENSIONS", 128))
+# multiplicateur de Fibonacci : répartit les codes de trigrammes entre les dimensions
+HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+class WordIndex:
+    """Index inversé {mot normalisé: lignes du deck}, construit une seule fois par deck.
+
+    Chaque mot de la requête doit apparaître dans la ligne ; le dernier mot est traité comme un
+    préfixe (recherche au fil de la frappe), résolu par dichotomie dans le vocabulaire trié.
+    Les colonnes reçues sont déjà normalisées (`Deck.normalized`).
+    """
+
+    __slots__ = ("vocabulary", "postings", "size")
+
+    def __init__(self, columns: Sequence[Sequence[str]]):
+        self.size = len(columns[0]) if columns else 0
+        tokens = pd.concat(
+            [pd.Series(column, dtype=object).str.split() for column in columns]
+        ).explode()
+        tokens = tokens[tokens.notna()]
+        pairs = pd.DataFrame(
+            {"token": tokens.to_numpy(), "row": tokens.index.to_numpy(dtype=np.int64)}
+        ).drop_duplicates()
+        pairs = pairs.sort_values(["token", "row"], kind="stable")
+        vocabulary, starts = np.unique(pairs["token"].to_numpy(), return_index=True)
+        self.vocabulary = vocabulary.tolist()
+        self.postings = np.split(pairs["row"].to_numpy(), starts[1:])
+
+    def _exact(self, token: str) -> np.ndarray:
+        position = bisect_left(self.vocabulary, token)
+        if position < len(self.vocabulary) and self.vocabulary[position] == token:
+            return self.postings[position]
+        return np.zeros(0, dtype=np.int64)
+
+    def _prefix(self, prefix: str) -> np.ndarray:
+        start = bisect_left(self.vocabulary, prefix)
+        end = bisect_left(self.vocabulary, prefix + "\U0010ffff")
+        if start == end:
+            return np.zeros(0, dtype=np.int64)
+        if end - start == 1:
+            return self.postings[start]
+        return np.unique(np.concatenate(self.postings[start:end]))
+
+    def search(self, query: str) -> np.ndarray:
+        """Renvoie les indices (triés) des lignes qui correspondent à la requête."""
+        tokens = normalize(query).split()
+        if not tokens:
+            return np.arange(self.size)
+        matches = [self._exact(token) for token in tokens[:-1]]
+        matches.append(self._prefix(tokens[-1]))
+        matches.sort(key=len)
+        return reduce(
+            lambda left, right: np.intersect1d(left, right, assume_unique=True), matches
+        )
+
+
+def _trigram_codes(texts: Sequence[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Code entier de chaque trigramme de la concaténation des textes, et texte qui le contient.
+
+    Renvoie (alphabet, codes, lignes) : les caractères sont recodés en O(n), sans tri, par leur
+    rang dans l'alphabet ; un trigramme à cheval sur deux textes appartient au premier.
+    """
+    blob = "".join(texts)
+    points = np.frombuffer(blob.encode("utf-32-le"), dtype=np.uint32)
+    present = np.zeros(int(points.max(initial=0)) + 1, dtype=bool)
+    present[points] = True
+    alphabet = np.flatnonzero(present).astype(np.uint32)
+    ids = (np.cumsum(present) - 1)[points]
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    owners = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)[:-2]
+    k = len(alphabet)
+    codes = (ids[:-2] * k + ids[1:-1]) * k + ids[2:]
+    return alphabet, codes, owners
+
+
+class TrigramIndex:
+    """Index inversé {trigramme: lignes du deck} sur les textes normalisés des deux colonnes.
+
+    - les postings sont stockés à plat (`keys`, `offsets`, `rows`), triés par trigramme puis par ligne
+    - `contains` => lignes contenant une sous-chaîne (intersection des postings, puis vérification)
+    - `fuzzy` => lignes partageant assez de trigrammes avec la requête, malgré des fautes de frappe
+
+    >>> index = TrigramIndex([("chat", "chien"), ("cat", "dog")])
+    >>> index.contains("g").tolist(), index.contains("t").tolist(), index.contains("og").tolist()
+    ([1], [0], [1])
+    """
+
+    __slots__ = ("texts", "alphabet", "keys", "offsets", "rows")
+
+    def __init__(self, columns: Sequence[Sequence[str]]):
+        # colonnes déjà normalisées (`Deck.normalized`)
+        self.texts = tuple(
+            SEPARATOR + SEPARATOR.join(parts) + SEPARATOR for parts in zip(*columns)
+        )
+        # un séparateur de plus après la dernière ligne, comme entre deux lignes : son dernier
+        # caractère commence lui aussi un trigramme (requêtes d'un seul caractère)
+        self.alphabet, codes, owners = _trigram_codes(self.texts + (SEPARATOR,))
+        # les positions sont déjà dans l'ordre des lignes : un tri stable par trigramme suffit
+        order = np.argsort(codes, kind="stable")
+        codes, owners = codes[order], owners[order]
+        keep = np.ones(len(codes), dtype=bool)
+        keep[1:] = (codes[1:] != codes[:-1]) | (owners[1:] != owners[:-1])
+        codes, owners = codes[keep], owners[keep]
+        self.keys, starts = np.unique(codes, return_index=True)
+        self.offsets = np.append(starts, len(codes))
+        self.rows = owners.astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def _encode(self, text: str) -> np.ndarray:
+        """Code les caractères dans l'alphabet du deck (-1 si absent du deck)."""
+        points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+        if not len(self.alphabet):
+            return np.full(len(points), -1, dtype=np.int64)
+        positions = np.searchsorted(self.alphabet, points)
+        positions[positions == len(self.alphabet)] = 0
+        return np.where(self.alphabet[positions] == points, positions, -1)
+
+    def _range(self, low: int, high: int) -> np.ndarray:
+        """Lignes des trigrammes dont le code est dans [low, high[."""
+        start, end = np.searchsorted(self.keys, (low, high))
+        return self.rows[self.offsets[start] : self.offsets[end]]
+
+    def _trigrams(self, ids: np.ndarray) -> np.ndarray:
+        k = len(self.alphabet)
+        codes = (ids[:-2] * k + ids[1:-1]) * k + ids[2:]
+        valid = (ids[:-2] >= 0) & (ids[1:-1] >= 0) & (ids[2:] >= 0)
+        return np.unique(codes[valid])
+
+    def contains(self, query: str) -> np.ndarray:
+        """Renvoie les indices (triés) des lignes dont un texte contient la requête."""
+        needle = normalize(query)
+        if not needle:
+            return np.arange(len(self))
+        ids = self._encode(needle)
+        if (ids < 0).any():
+            return np.zeros(0, dtype=np.int32)
+        k = len(self.alphabet)
+        if len(ids) < 3:
+            # chaque caractère d'un texte est suivi d'au moins un séparateur : la plage suffit
+            prefix = int(ids[0]) if len(ids) == 1 else int(ids[0]) * k + int(ids[1])
+            width = k ** (3 - len(ids))
+            return np.unique(self._range(prefix * width, (prefix + 1) * width))
+        postings = sorted(
+            (self._range(code, code + 1) for code in self._trigrams(ids)), key=len
+        )
+        candidates = postings[0]
+        for rows in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        if len(postings) == 1:
+            return candidates
+        texts = self.texts
+        return np.fromiter(
+            (row for row in candidates.tolist() if needle in texts[row]), dtype=np.int32
+        )
+
+    def fuzzy(self, query: str) -> np.ndarray:
+        """Renvoie les lignes proches de la requête, de la plus à la moins ressemblante.
+
+        Une faute de frappe détruit au plus 3 trigrammes : une ligne est retenue si elle partage
+        au moins `n - 3 × typo_budget(requête)` des `n` trigrammes de la requête.
+        """
+        needle = normalize(query)
+        codes = self._trigrams(self._encode(needle)) if len(needle) >= 3 else []
+        if not len(codes):
+            return self.contains(query)
+        hits = np.bincount(
+            np.concatenate([self._range(code, code + 1) for code in codes]),
+            minlength=len(self),
+        )
+        required = max(1, len(codes) - 3 * typo_budget(needle))
+        rows = np.flatnonzero(hits >= required)
+        return rows[np.argsort(-hits[rows], kind="stable")]
+
+    def search(self, query: str) -> np.ndarray:
+        """Sous-chaîne exacte d'abord, recherche approchée si rien ne correspond."""
+        rows = self.contains(query)
+        return rows if len(rows) else self.fuzzy(query)
+
+
+class NeighbourIndex:
+    """Vecteurs des trigrammes de caractères (hachés) de chaque texte d'une colonne normalisée.
+
+    Les vecteurs sont normalisés (L2) dans une matrice NumPy : les textes les plus proches d'une
+    ligne s'obtiennent par un seul produit matrice-vecteur et une sélection partielle
+    (`argpartition`), sans calcul de similarité entre toutes les paires de lignes.
+    """
+
+    __slots__ = ("texts", "vectors")
+
+    def __init__(self, texts: Sequence[str], dimensions: int = NEIGHBOUR_DIMENSIONS):
+        # textes déjà normalisés, entourés d'espaces pour marquer le début et la fin des mots
+        self.texts = tuple(texts)
+        padded = [f" {text} " for text in self.texts]
+        _, codes, owners = _trigram_codes(padded)
+        # les trigrammes à cheval sur deux textes sont écartés
+        lengths = np.fromiter(map(len, padded), dtype=np.int64, count=len(padded))
+        inside = owners == np.repeat(np.arange(len(padded)), lengths)[2:]
+        codes, owners = codes[inside], owners[inside]
+        buckets = (
+            codes.astype(np.uint64) * HASH_MULTIPLIER >> np.uint64(32)
+        ) % np.uint64(dimensions)
+        self.vectors = np.zeros((len(self.texts), dimensions), dtype=np.float32)
+        np.add.at(self.vectors, (owners, buckets.astype(np.int64)), 1.0)
+        norms = np.linalg.norm(self.vectors, axis=1, keepdims=True)
+        self.vectors /= np.maximum(norms, 1e-12)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def nearest(self, row: int, count: int) -> np.ndarray:
+        """Renvoie jusqu'à `count` lignes aux textes proches de celui de `row`, mais différents.
+
+        Les textes identiques (doublons, ou la ligne elle-même) et vides sont écartés.
+        """
+        size = len(self.texts)
+        if size <= 1 or count <= 0:
+            return np.zeros(0, dtype=np.int64)
+        scores = self.vectors @ self.vectors[row]
+        # marge pour les doublons écartés ensuite
+        top = min(size - 1, 4 * count + 1)
+        candidates = np.argpartition(-scores, top)[: top + 1]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        seen = {self.texts[row], ""}
+        picked = []
+        for candidate in candidates.tolist():
+            text = self.texts[candidate]
+            if text not in seen:
+                seen.add(text)
+                picked.append(candidate)
+                if len(picked) == count:
+                    break
+        return np.asarray(picked, dtype=np.int64)
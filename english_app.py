@@ -4,6 +4,7 @@ from annotated_text import annotated_text
 from components.app_components import *
 
 
+@profiler.rerun
 def main():
     page_config()
     remove_white_space()
@@ -19,50 +20,88 @@ def main():
     check = check_columns(data)
     if check:
         mode = select_mode(data, selected_language)
+        select_user(selected_language)
 
         # Affichage en fonction du mode sélectionné
         if mode == "📚 Apprentissage" or mode == "📚 Learning":
-            display_data(data, selected_language)
+            deck = get_deck(data)
+            display_data(data, selected_language, deck)
 
         elif mode == "🎲 Texte aléatoire" or mode == "🎲 Random text":
-            user_translation, submit, clear = random_text(data, selected_language)
+            deck = filter_deck(get_deck(data), selected_language)
+            user_translation, submit, clear = random_text(deck, selected_language)
             if submit:
-                post_submit(selected_language, user_translation)
+                post_submit(selected_language, user_translation, deck)
             if clear:
                 # Réinitialise les mots aléatoires
                 (
                     st.session_state.random_word,
                     st.session_state.correct_translation,
-                ) = get_random_word(data, selected_language)
+                ) = get_random_word(deck, selected_language)
                 st.rerun()
 
         elif mode == "🏋️‍♂️ Entraînement" or mode == "🏋️‍♂️ Training session":
+            deck = filter_deck(get_deck(data), selected_language)
+            resume_training(deck)
             if "index" not in st.session_state:
                 st.session_state.index = 0
-            if st.session_state.index >= len(data):
+            if st.session_state.index >= len(deck):
                 st.session_state.index = 0
             if "score" not in st.session_state:
                 st.session_state.score = 0
             if st.session_state.index == 0:
                 st.session_state.score = 0
-            check_session_state_train(data, selected_language)
+            check_session_state_train(deck, selected_language)
             train_text_subheader(selected_language)
+            display_annotation(deck, st.session_state.next_word, selected_language)
             user_translation_train, submit_train, clear_train = userform_train(
                 selected_language
             )
             if submit_train:
-                post_submit_train(selected_language, user_translation_train)
-            index_writer_train(data, selected_language)
+                post_submit_train(selected_language, user_translation_train, deck)
+                save_training_position(deck)
+            index_writer_train(deck, selected_language)
             score_writer_train(selected_language)
             if clear_train:
                 # va chercher un nouveau mot
                 (
                     st.session_state.next_word,
                     st.session_state.correct_translation_train,
-                ) = get_next_word(data, selected_language)
+                ) = get_next_word(deck, selected_language)
+                save_training_position(deck)
                 st.rerun()
-            if st.session_state.index == len(data) - 1:
-                final_scorer(data)
+            if st.session_state.index == len(deck) - 1:
+                final_scorer(deck)
+
+        elif mode == "🧠 Répétition espacée" or mode == "🧠 Spaced repetition":
+            deck = get_deck(data)
+            scheduler = get_scheduler(deck)
+            srs_text_subheader(deck, selected_language)
+            display_annotation(
+                deck,
+                deck.card(st.session_state.srs_card, selected_language)[0],
+                selected_language,
+            )
+            user_translation_srs, submit_srs, _ = userform_srs(selected_language)
+            if submit_srs:
+                post_submit_srs(
+                    selected_language, user_translation_srs, deck, scheduler
+                )
+            reviews_writer_srs(selected_language)
+
+        elif mode == "🔤 QCM" or mode == "🔤 Multiple choice":
+            deck = filter_deck(get_deck(data), selected_language)
+            choice, submit_choice, next_choice = multiple_choice(
+                deck, selected_language
+            )
+            if submit_choice:
+                post_submit_choice(selected_language, choice, deck)
+            score_writer_choice(selected_language)
+            if next_choice:
+                new_choice_card(deck, selected_language)
+                st.rerun()
+        display_hardest_cards(get_deck(data), selected_language)
+        display_index_status(get_deck(data), selected_language)
     else:
         if data is not None:
             if selected_language == "FR":
@@ -73,6 +112,7 @@ def main():
                 st.write(
                     "> Sadly, no column **French** or **English** has been found in the dataset."
                 )
+    display_performance_panel(selected_language)
 
 
 if __name__ == "__main__":